@@ -34,6 +34,9 @@ class LebotApp:
         # Socket mode handler
         self.handler = None
 
+        # Shutdown task started by a signal handler
+        self._shutdown_task = None
+
     async def start(self):
         """Start the application."""
         # Register listeners and get conversation manager
@@ -45,7 +48,7 @@ class LebotApp:
         # Setup signal handlers for graceful shutdown
         loop = asyncio.get_event_loop()
         for sig in (signal.SIGTERM, signal.SIGINT):
-            loop.add_signal_handler(sig, lambda: asyncio.create_task(self.shutdown()))
+            loop.add_signal_handler(sig, self._on_signal)
 
         try:
             self.logger.info("Starting Lebot...")
@@ -55,6 +58,10 @@ class LebotApp:
         finally:
             await self.shutdown()
 
+    def _on_signal(self):
+        """Schedule shutdown from a signal handler, keeping a reference so the task isn't collected."""
+        self._shutdown_task = asyncio.create_task(self.shutdown())
+
     async def shutdown(self):
         """Gracefully shutdown the application."""
         self.logger.info("Performing graceful shutdown...")
@@ -69,6 +76,16 @@ class LebotApp:
             await self.handler.close_async()
             self.logger.info("Socket mode handler closed")
 
+        # Close the Anthropic HTTP connection pool
+        llm = getattr(self.app, "_llm", None)
+        if llm:
+            await llm.aclose()
+            self.logger.info("LLM client closed")
+
+        # Stop the tool thread pool and the bash shell
+        self.tool_registry.close()
+        self.logger.info("Tool registry closed")
+
         self.logger.info("Shutdown complete")
 
 
@@ -79,4 +96,10 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Prefer uvloop's libuv-based event loop when it is installed (it isn't available on Windows)
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
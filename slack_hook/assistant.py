@@ -1,7 +1,7 @@
 """Async version of assistant handlers with coroutine-based conversation management."""
 
 import logging
-from typing import Any, Dict
+from typing import Any, Awaitable, Callable, Dict, List
 
 from slack_bolt import BoltContext
 from slack_bolt.middleware.assistant.async_assistant import AsyncAssistant
@@ -15,6 +15,38 @@ from .claude import AsyncClaude
 from tools import ToolRegistry
 
 
+def _greeting_blocks(beast_mode: bool = False) -> List[Dict[str, Any]]:
+    """Build the greeting blocks with model selection buttons, highlighting the active mode."""
+    beast_button: Dict[str, Any] = {
+        "type": "button",
+        "text": {"type": "plain_text", "text": ":zap: Beast Mode (Opus 4)", "emoji": True},
+        "value": "beast_mode",
+        "action_id": "enable_beast_mode",
+    }
+    normal_button: Dict[str, Any] = {
+        "type": "button",
+        "text": {
+            "type": "plain_text",
+            "text": ":white_check_mark: Normal Mode (Sonnet 4)",
+            "emoji": True,
+        },
+        "value": "normal_mode",
+        "action_id": "enable_normal_mode",
+    }
+    if beast_mode:
+        beast_button["style"] = "danger"
+        current = "Currently using: *:zap: Beast Mode* (Claude Opus 4)"
+    else:
+        normal_button["style"] = "primary"
+        current = "Currently using: *Normal Mode* (Claude Sonnet 4)"
+
+    return [
+        {"type": "section", "text": {"type": "mrkdwn", "text": "How can I help you?"}},
+        {"type": "actions", "elements": [beast_button, normal_button]},
+        {"type": "context", "elements": [{"type": "mrkdwn", "text": current}]},
+    ]
+
+
 def create_assistant(
     tool_registry: ToolRegistry, conversation_manager: ConversationManager, llm: AsyncClaude
 ) -> AsyncAssistant:
@@ -40,35 +72,7 @@ def create_assistant(
         try:
             # Send greeting with model selection buttons
             await say(
-                blocks=[
-                    {"type": "section", "text": {"type": "mrkdwn", "text": "How can I help you?"}},
-                    {
-                        "type": "actions",
-                        "elements": [
-                            {
-                                "type": "button",
-                                "text": {"type": "plain_text", "text": ":zap: Beast Mode (Opus 4)", "emoji": True},
-                                "value": "beast_mode",
-                                "action_id": "enable_beast_mode",
-                            },
-                            {
-                                "type": "button",
-                                "text": {
-                                    "type": "plain_text",
-                                    "text": ":white_check_mark: Normal Mode (Sonnet 4)",
-                                    "emoji": True,
-                                },
-                                "value": "normal_mode",
-                                "action_id": "enable_normal_mode",
-                                "style": "primary",
-                            },
-                        ],
-                    },
-                    {
-                        "type": "context",
-                        "elements": [{"type": "mrkdwn", "text": "Currently using: *Normal Mode* (Claude Sonnet 4)"}],
-                    },
-                ],
+                blocks=_greeting_blocks(),
                 text="How can I help you?",
             )
         except Exception as e:
@@ -114,11 +118,17 @@ def create_assistant(
     return assistant
 
 
-def create_beast_mode_handler(conversation_manager: ConversationManager):
-    """Create beast mode button handler with conversation manager."""
+def _create_mode_handler(conversation_manager: ConversationManager, beast_mode: bool):
+    """Create a model selection button handler with conversation manager."""
+    model = "claude-opus-4-20250514" if beast_mode else "claude-sonnet-4-20250514"
+    confirmation = (
+        ":zap: *Beast Mode Activated!* :zap:\nUsing Claude Opus 4 for maximum intelligence."
+        if beast_mode
+        else ":white_check_mark: Switched to normal mode (Claude Sonnet 4)."
+    )
 
-    async def handle_beast_mode_button(ack: AsyncAck, body: Dict[str, Any], client: AsyncWebClient, logger: logging.Logger):
-        """Handle beast mode button click."""
+    async def handle_mode_button(ack: AsyncAck, body: Dict[str, Any], client: AsyncWebClient, logger: logging.Logger):
+        """Handle model selection button click."""
         await ack()
 
         channel_id = body.get("channel", {}).get("id")
@@ -131,121 +141,32 @@ def create_beast_mode_handler(conversation_manager: ConversationManager):
             return
 
         # Set model preference in conversation manager
-        conversation_manager.set_model_preference(channel_id, thread_ts, "claude-opus-4-20250514")
+        conversation_manager.set_model_preference(channel_id, thread_ts, model)
 
         # Update the message
         try:
             await client.chat_update(
                 channel=channel_id,
                 ts=message_ts,
-                blocks=[
-                    {"type": "section", "text": {"type": "mrkdwn", "text": "How can I help you?"}},
-                    {
-                        "type": "actions",
-                        "elements": [
-                            {
-                                "type": "button",
-                                "text": {"type": "plain_text", "text": ":zap: Beast Mode (Opus 4)", "emoji": True},
-                                "value": "beast_mode",
-                                "action_id": "enable_beast_mode",
-                                "style": "danger",
-                            },
-                            {
-                                "type": "button",
-                                "text": {
-                                    "type": "plain_text",
-                                    "text": ":white_check_mark: Normal Mode (Sonnet 4)",
-                                    "emoji": True,
-                                },
-                                "value": "normal_mode",
-                                "action_id": "enable_normal_mode",
-                            },
-                        ],
-                    },
-                    {
-                        "type": "context",
-                        "elements": [{"type": "mrkdwn", "text": "Currently using: *:zap: Beast Mode* (Claude Opus 4)"}],
-                    },
-                ],
+                blocks=_greeting_blocks(beast_mode),
                 text="How can I help you?",
             )
 
-            await client.chat_postMessage(
-                channel=channel_id,
-                thread_ts=thread_ts,
-                text=":zap: *Beast Mode Activated!* :zap:\nUsing Claude Opus 4 for maximum intelligence.",
-            )
+            await client.chat_postMessage(channel=channel_id, thread_ts=thread_ts, text=confirmation)
         except Exception as e:
             logger.error(f"Failed to update message: {e}")
 
-    return handle_beast_mode_button
-
-
-def create_normal_mode_handler(conversation_manager: ConversationManager):
-    """Create normal mode button handler with conversation manager."""
-
-    async def handle_normal_mode_button(ack: AsyncAck, body: Dict[str, Any], client: AsyncWebClient, logger: logging.Logger):
-        """Handle normal mode button click."""
-        await ack()
-
-        channel_id = body.get("channel", {}).get("id")
-        thread_ts = body.get("message", {}).get("thread_ts") or body.get("message", {}).get("ts")
-        user_id = body.get("user", {}).get("id")
-        message_ts = body.get("message", {}).get("ts")
-
-        if not channel_id or not user_id or not thread_ts:
-            logger.error(f"Missing required fields: channel={channel_id}, user={user_id}, thread={thread_ts}")
-            return
+    return handle_mode_button
 
-        # Set model preference in conversation manager
-        conversation_manager.set_model_preference(channel_id, thread_ts, "claude-sonnet-4-20250514")
 
-        # Update the message
-        try:
-            await client.chat_update(
-                channel=channel_id,
-                ts=message_ts,
-                blocks=[
-                    {"type": "section", "text": {"type": "mrkdwn", "text": "How can I help you?"}},
-                    {
-                        "type": "actions",
-                        "elements": [
-                            {
-                                "type": "button",
-                                "text": {"type": "plain_text", "text": ":zap: Beast Mode (Opus 4)", "emoji": True},
-                                "value": "beast_mode",
-                                "action_id": "enable_beast_mode",
-                            },
-                            {
-                                "type": "button",
-                                "text": {
-                                    "type": "plain_text",
-                                    "text": ":white_check_mark: Normal Mode (Sonnet 4)",
-                                    "emoji": True,
-                                },
-                                "value": "normal_mode",
-                                "action_id": "enable_normal_mode",
-                                "style": "primary",
-                            },
-                        ],
-                    },
-                    {
-                        "type": "context",
-                        "elements": [{"type": "mrkdwn", "text": "Currently using: *Normal Mode* (Claude Sonnet 4)"}],
-                    },
-                ],
-                text="How can I help you?",
-            )
+def create_beast_mode_handler(conversation_manager: ConversationManager):
+    """Create beast mode button handler with conversation manager."""
+    return _create_mode_handler(conversation_manager, beast_mode=True)
 
-            await client.chat_postMessage(
-                channel=channel_id,
-                thread_ts=thread_ts,
-                text=":white_check_mark: Switched to normal mode (Claude Sonnet 4).",
-            )
-        except Exception as e:
-            logger.error(f"Failed to update message: {e}")
 
-    return handle_normal_mode_button
+def create_normal_mode_handler(conversation_manager: ConversationManager):
+    """Create normal mode button handler with conversation manager."""
+    return _create_mode_handler(conversation_manager, beast_mode=False)
 
 
 def create_emergency_stop_handler(conversation_manager: ConversationManager):
@@ -275,3 +196,28 @@ def create_emergency_stop_handler(conversation_manager: ConversationManager):
         logger.info(f"Emergency stop triggered by {user_id} for {conv_id}")
 
     return handle_emergency_stop
+
+
+def create_history_invalidation_middleware(conversation_manager: ConversationManager):
+    """Create middleware that drops cached thread history when a message in the thread is edited or deleted.
+
+    It has to run before the assistant middleware, which acknowledges these events in assistant threads
+    without passing them on to other listeners.
+    """
+
+    async def invalidate_edited_history(body: Dict[str, Any], next: Callable[[], Awaitable[Any]]):
+        """Invalidate history on message_changed and message_deleted events, then continue."""
+        event = body.get("event") or {}
+        subtype = event.get("subtype")
+        if event.get("type") == "message" and subtype in ("message_changed", "message_deleted"):
+            message = event.get("message") or {}
+            previous = event.get("previous_message") or {}
+            thread_ts = message.get("thread_ts") or previous.get("thread_ts")
+            # Adding a reply also sends message_changed for the parent, with the text unchanged
+            edited = subtype == "message_deleted" or message.get("text") != previous.get("text")
+            if event.get("channel") and thread_ts and edited:
+                ts = message.get("ts") or event.get("deleted_ts") or previous.get("ts")
+                conversation_manager.invalidate_history(event["channel"], thread_ts, ts)
+        await next()
+
+    return invalidate_edited_history
@@ -1,20 +1,129 @@
 """Async version of Claude LLM integration with cancellation support."""
 
 import os
-import re
 import time
-import json
 import asyncio
-from typing import List, Dict, Any, Optional, Callable
+import functools
+import hashlib
+import inspect
+import re
+import weakref
+from dataclasses import dataclass, field
+from datetime import datetime
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Callable, Union, Awaitable
 from pathlib import Path
 
-from anthropic import AsyncAnthropic
+import httpx
+import orjson
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
 from slack_bolt.context.set_status.async_set_status import AsyncSetStatus
+from slack_sdk.errors import SlackApiError
+
+from .formatting import markdown_to_slack
+
+# Tool results mentioning an error get a red attachment; searched in place rather than lowercasing a copy
+_ERROR_RE = re.compile("error", re.IGNORECASE)
+
+# Team member table appended to the system prompt from TEAM_MEMBER_MAPPING
+_TEAM_TABLE_FIELDS = ("linear_name", "linear_email", "slack_user_id", "slack_mention", "slack_handle")
+_TEAM_TABLE_HEADER = (
+    "\n\n## Our Folks\n"
+    "| Linear Name | Linear Email | Slack User ID | Slack Mention | Slack Handle |\n"
+    "|-------------|--------------|---------------|---------------|--------------|"
+)
+
+# prompts/system.md in the project root (parent of slack_hook), re-read only when its mtime changes
+_SYSTEM_MD_PATH = Path(__file__).parent.parent / "prompts" / "system.md"
+_system_md_cache: Dict[str, Any] = {"mtime": None, "text": None}
+
+
+def _read_system_md() -> Optional[str]:
+    """Return prompts/system.md without its leading markdown header, or None if it doesn't exist."""
+    try:
+        mtime = os.stat(_SYSTEM_MD_PATH).st_mtime
+    except FileNotFoundError:
+        return None
+    if mtime != _system_md_cache["mtime"]:
+        with open(_SYSTEM_MD_PATH, "r", encoding="utf-8") as f:
+            lines = f.read().split("\n")
+        # Remove the first line if it's a markdown header
+        if lines and lines[0].startswith("#"):
+            lines = lines[1:]
+        _system_md_cache["text"] = "\n".join(lines).strip()
+        _system_md_cache["mtime"] = mtime
+    return _system_md_cache["text"]
+
+
+@functools.lru_cache(maxsize=2)
+def _team_table(team_mapping_json: Optional[str]) -> str:
+    """Build the team member table from TEAM_MEMBER_MAPPING, or an empty string if unset or invalid."""
+    if not team_mapping_json:
+        return ""
+    try:
+        # Sorted so the prompt (and its prompt cache entry) doesn't depend on mapping order
+        team_members = sorted(orjson.loads(team_mapping_json), key=lambda m: m.get("slack_user_id", ""))
+        rows = ["| " + " | ".join(member.get(field, "") for field in _TEAM_TABLE_FIELDS) + " |" for member in team_members]
+    except (orjson.JSONDecodeError, TypeError) as e:
+        print(f"Warning: Could not parse TEAM_MEMBER_MAPPING: {e}")
+        return ""
+    return _TEAM_TABLE_HEADER + "".join("\n" + row for row in rows)
+
+
+@dataclass(slots=True)
+class _StreamState:
+    """Per-response state shared by the stream event handlers."""
+
+    say: Any
+    set_status: AsyncSetStatus
+    run_tool: Callable[[str, Dict[str, Any]], Awaitable[str]]
+    response_ts: int  # Attachment timestamp shared by every post of this response
+    slack_client: Any = None
+
+    # Completed blocks; thinking is buffered until we start outputting
+    thinking_blocks: List[Dict[str, Any]] = field(default_factory=list)
+    text_blocks: List[Dict[str, Any]] = field(default_factory=list)
+    tool_use_blocks: List[Dict[str, Any]] = field(default_factory=list)
+    pending_tools: List[tuple] = field(default_factory=list)  # (tool_use_block, task) for started tools
+
+    # Block currently being streamed
+    current_text: str = ""
+    text_message: Any = None  # Slack message showing the text block while it streams
+    pending_text: List[str] = field(default_factory=list)  # Completed text blocks not yet posted
+    text_updated_at: float = 0.0
+    current_tool_use: Optional[Dict[str, str]] = None
+    thinking_sent: bool = False  # Track if we've sent thinking blocks to Slack
+    thinking_post: Optional[asyncio.Task] = None  # Background post of the buffered thinking blocks
 
 
 class AsyncClaude:
     """Async Claude client with cancellation support."""
 
+    # Slack accepts up to 100 attachments per message but recommends no more than 20
+    MAX_ATTACHMENTS_PER_MESSAGE = 20
+    # Seconds between chat.update calls while a text block streams (chat.update is Tier 3)
+    TEXT_UPDATE_INTERVAL = 2.0
+    # Maximum number of responses kept in the response cache
+    RESPONSE_CACHE_SIZE = 1024
+    # Tool results at least this long are sent once per request; repeats become a reference
+    TOOL_RESULT_DEDUP_MIN_CHARS = 1024
+    # Maximum number of full tool results kept for fetch_tool_result
+    TOOL_RESULT_STORE_SIZE = 256
+    # Lets the model page through tool results that were truncated by MAX_TOOL_RESULT_CHARS
+    FETCH_TOOL_RESULT_SCHEMA = {
+        "type": "custom",
+        "name": "fetch_tool_result",
+        "description": "Read more of a tool result that was truncated. Use the ref and offset given in the truncation notice.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "ref": {"type": "string", "description": "Reference from the truncation notice"},
+                "offset": {"type": "integer", "description": "Character offset to continue reading from"},
+            },
+            "required": ["ref"],
+        },
+    }
+
     # Try to load system prompt from CLAUDE.md, fallback to default
     DEFAULT_SYSTEM_CONTENT = """
 You're an assistant in a Slack workspace.
@@ -25,66 +134,395 @@ When a prompt has Slack's special syntax like <@USER_ID> or <#CHANNEL_ID>, you m
 
     @classmethod
     def _load_system_prompt(cls) -> str:
-        """Load system prompt from prompts/system.md if available and append today's date info."""
-        base_prompt = ""
+        """Load the system prompt, reusing the cached build while system.md, the team mapping and the hour are unchanged."""
+        hour_epoch = int(time.time()) // 3600
         try:
-            # Get the project root directory (parent of slack_hook)
-            current_dir = Path(__file__).parent
-            project_root = current_dir.parent
-            system_prompt_path = project_root / "prompts" / "system.md"
-
-            if system_prompt_path.exists():
-                with open(system_prompt_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    # Remove the first line if it's a markdown header
-                    lines = content.split("\n")
-                    if lines and lines[0].startswith("#"):
-                        lines = lines[1:]
-                    base_prompt = "\n".join(lines).strip()
-            else:
-                base_prompt = cls.DEFAULT_SYSTEM_CONTENT
+            # A stat() per call; system.md is only re-read when its mtime changes
+            system_md = _read_system_md()
         except Exception as e:
             print(f"Warning: Could not load system.md: {e}")
-            base_prompt = cls.DEFAULT_SYSTEM_CONTENT
+            system_md = None
+        return cls._build_system_prompt(hour_epoch, system_md, os.getenv("TEAM_MEMBER_MAPPING"))
 
-        # Append team member mapping if available from environment
-        team_mapping_json = os.getenv("TEAM_MEMBER_MAPPING")
-        if team_mapping_json:
-            try:
-                team_members = json.loads(team_mapping_json)
-
-                # Build the team member table
-                team_section = "\n\n## Our Folks\n"
-                team_section += "| Linear Name | Linear Email | Slack User ID | Slack Mention | Slack Handle |\n"
-                team_section += "|-------------|--------------|---------------|---------------|--------------|"
-
-                for member in team_members:
-                    team_section += (
-                        f"\n| {member.get('linear_name', '')} | {member.get('linear_email', '')} | "
-                        f"{member.get('slack_user_id', '')} | {member.get('slack_mention', '')} | "
-                        f"{member.get('slack_handle', '')} |"
-                    )
+    @classmethod
+    @functools.lru_cache(maxsize=2)
+    def _build_system_prompt(cls, hour_epoch: int, system_md: Optional[str], team_mapping_json: Optional[str]) -> str:
+        """Build the system prompt from prompts/system.md (or the default) and append team and date info.
 
-                base_prompt += team_section
-            except (json.JSONDecodeError, TypeError) as e:
-                print(f"Warning: Could not parse TEAM_MEMBER_MAPPING: {e}")
+        Cached per hour bucket, system.md content and team mapping, so the prompt is rebuilt at most once an
+        hour unless one of them changes.
+        """
+        base_prompt = system_md if system_md is not None else cls.DEFAULT_SYSTEM_CONTENT
 
         # Append current date and time information (hour precision for caching)
-        import datetime
+        hour_precision = datetime.fromtimestamp(hour_epoch * 3600).astimezone()
+        date_info = (
+            f"\n\n**Current context**: {hour_precision.strftime('%A, %Y-%m-%d %H:00')} ({str(hour_precision.tzinfo)})"
+        )
 
-        now = datetime.datetime.now().astimezone()
-        # Round to hour precision for better cache utilization
-        hour_precision = now.replace(minute=0, second=0, microsecond=0)
-        date_info = f"\n\n**Current context**: {hour_precision.strftime('%A, %Y-%m-%d %H:00')} ({str(now.tzinfo)})"
+        return base_prompt + _team_table(team_mapping_json) + date_info
 
-        return base_prompt + date_info
+    @staticmethod
+    @functools.lru_cache(maxsize=4)
+    def _system_blocks(system_content: str) -> List[Dict[str, Any]]:
+        """Wrap the system prompt with cache control, reusing the same list for identical prompts."""
+        # Since we use hour precision, the entire prompt can be cached
+        return [{"type": "text", "text": system_content, "cache_control": {"type": "ephemeral"}}]
 
-    def __init__(self, api_key: Optional[str] = None):
+    @staticmethod
+    def _tool_blocks(tools_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add cache control to tool schemas."""
+        # Sorted by name so the cached prefix is byte-identical regardless of registration order
+        tools_list = sorted(tools_list, key=itemgetter("name"))
+        # A cache breakpoint covers the whole prefix before it, so one on the last tool caches all tools
+        # (the API allows at most 4 breakpoints per request)
+        tools_list[-1] = {**tools_list[-1], "cache_control": {"type": "ephemeral"}}
+        return tools_list
+
+    def __init__(self, api_key: Optional[str] = None, max_tool_concurrency: int = 8):
         if api_key is None:
             api_key = os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
             raise ValueError("ANTHROPIC_API_KEY environment variable is required")
-        self.client = AsyncAnthropic(api_key=api_key)
+        # The SDK closes idle connections after 5s, which is shorter than most tool rounds; keep them
+        # alive longer so follow-up requests reuse the TLS connection instead of reconnecting
+        self.client = AsyncAnthropic(
+            api_key=api_key,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=120.0),
+                timeout=httpx.Timeout(600.0, connect=5.0),
+            ),
+        )
+        # Limits how many tool calls run at once across all conversations
+        self._tool_semaphore = asyncio.Semaphore(max_tool_concurrency)
+        # Optional exact-match cache for tool-free responses, enabled by RESPONSE_CACHE_TTL (seconds)
+        self._response_cache_ttl = float(os.getenv("RESPONSE_CACHE_TTL", "0"))
+        self._response_cache: Dict[bytes, tuple[float, List[Dict[str, Any]]]] = {}
+        # Tool results longer than MAX_TOOL_RESULT_CHARS are truncated for the model (0 disables);
+        # the full text is kept here, keyed by ref, for fetch_tool_result
+        self._max_tool_result_chars = int(os.getenv("MAX_TOOL_RESULT_CHARS", "20000"))
+        self._tool_result_store: Dict[str, str] = {}
+        # Cache-controlled tool list per registry; registries build their schemas once, so it is reused as is
+        self._registry_tool_blocks: "weakref.WeakKeyDictionary[Any, List[Dict[str, Any]]]" = weakref.WeakKeyDictionary()
+        # Stream event handlers, keyed by event type; events of other types are ignored
+        self._event_handlers = {
+            "content_block_start": self._on_block_start,
+            "text": self._on_text,
+            "content_block_stop": self._on_block_stop,
+        }
+        # content_block_start and content_block_stop handlers, keyed by block type
+        self._block_start_handlers = {
+            "text": self._start_text_block,
+            "tool_use": self._start_tool_use_block,
+        }
+        self._block_stop_handlers = {
+            "thinking": self._finish_thinking_block,
+            "text": self._finish_text_block,
+            "tool_use": self._finish_tool_use_block,
+        }
+
+    async def aclose(self) -> None:
+        """Close the HTTP connection pool."""
+        await self.client.close()
+
+    def _tool_runner(self, tool_registry: Any) -> Callable[[str, Dict[str, Any]], Awaitable[str]]:
+        """Resolve how to execute tools on this registry once, instead of per tool call."""
+        if hasattr(tool_registry, "async_execute_tool"):
+            run_tool = tool_registry.async_execute_tool
+        else:
+
+            async def run_tool(tool_name: str, tool_input: Dict[str, Any]) -> str:
+                # Fallback to sync execution in thread pool; ToolRegistry runs its sync tools in its own pool
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, tool_registry.execute_tool, tool_name, tool_input)
+
+        if self._max_tool_result_chars <= 0:
+            return run_tool
+
+        async def run_tool_or_fetch(tool_name: str, tool_input: Dict[str, Any]) -> str:
+            # fetch_tool_result is answered from the store rather than the registry
+            if tool_name == self.FETCH_TOOL_RESULT_SCHEMA["name"]:
+                return self._read_tool_result(tool_input.get("ref", ""), tool_input.get("offset", 0))
+            return await run_tool(tool_name, tool_input)
+
+        return run_tool_or_fetch
+
+    def _truncation_notice(self, ref: str, offset: int, total: int) -> str:
+        """Describe how to read the rest of a truncated tool result."""
+        return (
+            f"\n...[truncated: {total - offset} more characters; call fetch_tool_result with "
+            f'ref="{ref}" and offset={offset} to read more]'
+        )
+
+    def _truncate_tool_result(self, content: str) -> str:
+        """Shorten a long tool result for the model, keeping the full text for fetch_tool_result."""
+        limit = self._max_tool_result_chars
+        if limit <= 0 or len(content) <= limit:
+            return content
+        ref = hashlib.blake2b(content.encode(), digest_size=6).hexdigest()
+        if ref not in self._tool_result_store and len(self._tool_result_store) >= self.TOOL_RESULT_STORE_SIZE:
+            # Dicts keep insertion order, so the first key is the oldest entry
+            del self._tool_result_store[next(iter(self._tool_result_store))]
+        self._tool_result_store[ref] = content
+        return content[:limit] + self._truncation_notice(ref, limit, len(content))
+
+    def _read_tool_result(self, ref: str, offset: int = 0) -> str:
+        """Return the next chunk of a stored tool result."""
+        content = self._tool_result_store.get(ref)
+        if content is None:
+            return f"Error: Unknown or expired tool result ref {ref!r}"
+        offset = max(int(offset or 0), 0)
+        end = offset + self._max_tool_result_chars
+        chunk = content[offset:end]
+        if end < len(content):
+            chunk += self._truncation_notice(ref, end, len(content))
+        return chunk
+
+    async def _execute_tool(
+        self,
+        run_tool: Callable[[str, Dict[str, Any]], Awaitable[str]],
+        tool_name: str,
+        tool_input: Dict[str, Any],
+        after: Optional[asyncio.Task] = None,
+    ) -> str:
+        """Execute a single tool, bounded by the shared tool concurrency limit.
+
+        Args:
+            run_tool: Tool runner from _tool_runner
+            tool_name: Name of the tool to execute
+            tool_input: Input parameters for the tool
+            after: Optional earlier call to the same tool that must finish first
+        """
+        if after is not None:
+            # Tools like bash keep session state, so calls to the same tool keep their order
+            await asyncio.wait([after])
+
+        async with self._tool_semaphore:
+            return await run_tool(tool_name, tool_input)
+
+    @staticmethod
+    async def _post_thinking(say: Any, thinking_block: Dict[str, Any], ts: int) -> None:
+        """Post a thinking block to Slack as a quote, keeping its signature in the attachment footer."""
+        quoted_text = "> " + thinking_block["thinking"].replace("\n", "\n> ")
+        signature = thinking_block.get("signature", "")
+        await say(
+            text=quoted_text,
+            attachments=[
+                {
+                    "color": "#e0e0e0",  # Light gray for thinking
+                    "text": "",  # Empty text, just using for metadata
+                    "footer": f"thinking:{signature}" if signature else "thinking",
+                    "ts": ts,
+                }
+            ],
+        )
+
+    @classmethod
+    async def _post_thinking_blocks(cls, say: Any, thinking_blocks: List[Dict[str, Any]], ts: int) -> None:
+        """Post thinking blocks to Slack in order."""
+        for thinking_block in thinking_blocks:
+            await cls._post_thinking(say, thinking_block, ts)
+
+    @staticmethod
+    async def _wait_thinking_post(state: "_StreamState") -> None:
+        """Wait for the background thinking post so that later posts keep the thread order."""
+        if state.thinking_post is not None:
+            await state.thinking_post
+            state.thinking_post = None
+
+    @staticmethod
+    def _response_cache_key(
+        model: str,
+        system_content: str,
+        tools_list: List[Dict[str, Any]],
+        messages: List[Dict[str, Any]],
+        thinking_budget: int,
+    ) -> bytes:
+        """Hash everything that determines a response into a response cache key."""
+        payload = orjson.dumps(
+            {"m": model, "s": system_content, "t": tools_list, "msgs": messages, "b": thinking_budget},
+            option=orjson.OPT_SORT_KEYS,
+            default=str,
+        )
+        return hashlib.blake2b(payload, digest_size=16).digest()
+
+    def _get_cached_response(self, key: bytes) -> Optional[List[Dict[str, Any]]]:
+        """Return cached content blocks for key, or None if missing or expired."""
+        entry = self._response_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, content_blocks = entry
+        if expires_at < time.monotonic():
+            del self._response_cache[key]
+            return None
+        return content_blocks
+
+    def _cache_response(self, key: bytes, content_blocks: List[Dict[str, Any]]) -> None:
+        """Store a tool-free response, evicting the oldest entry when full."""
+        if key not in self._response_cache and len(self._response_cache) >= self.RESPONSE_CACHE_SIZE:
+            # Dicts keep insertion order, so the first key is the oldest entry
+            del self._response_cache[next(iter(self._response_cache))]
+        self._response_cache[key] = (time.monotonic() + self._response_cache_ttl, content_blocks)
+
+    def _compact_tool_results(
+        self, content_blocks: List[Dict[str, Any]], tool_results: List[Dict[str, Any]], seen: Dict[bytes, str]
+    ) -> None:
+        """Shrink tool results before they are sent back to the model.
+
+        Large results identical to one sent earlier in the request become a reference, and results
+        over MAX_TOOL_RESULT_CHARS are truncated. fetch_tool_result output is already a bounded chunk.
+        """
+        fetch_ids = {
+            block["id"]
+            for block in content_blocks
+            if block["type"] == "tool_use" and block["name"] == self.FETCH_TOOL_RESULT_SCHEMA["name"]
+        }
+        for block in tool_results:
+            content = block["content"]
+            if not isinstance(content, str):
+                continue
+            if len(content) >= self.TOOL_RESULT_DEDUP_MIN_CHARS:
+                digest = hashlib.blake2b(content.encode(), digest_size=16).digest()
+                first_id = seen.setdefault(digest, block["tool_use_id"])
+                if first_id != block["tool_use_id"]:
+                    block["content"] = f"[Identical to the result of tool_use_id {first_id}]"
+                    continue
+            if block["tool_use_id"] not in fetch_ids:
+                block["content"] = self._truncate_tool_result(content)
+
+    async def _replay_response(self, say: Any, content_blocks: List[Dict[str, Any]]) -> None:
+        """Post a cached response to Slack the same way a streamed one is posted."""
+        response_ts = int(time.time())
+        await self._post_thinking_blocks(
+            say, [block for block in content_blocks if block["type"] == "thinking"], response_ts
+        )
+        text = "\n\n".join(block["text"] for block in content_blocks if block["type"] == "text")
+        if text:
+            await say(self.markdown_to_slack(text))
+
+    async def _on_block_start(self, event: Any, state: "_StreamState") -> None:
+        """Handle the start of a new content block."""
+        block = getattr(event, "content_block", None)
+        handler = self._block_start_handlers.get(getattr(block, "type", None))
+        if handler is not None:
+            await handler(block, state)
+
+    async def _start_text_block(self, block: Any, state: "_StreamState") -> None:
+        """Reset text state for a new text block and post any buffered thinking."""
+        # If we have buffered thinking blocks, post them in the background while the
+        # text streams in; later posts wait for them so the thread order is unchanged
+        if state.thinking_blocks and not state.thinking_sent:
+            state.thinking_post = asyncio.create_task(
+                self._post_thinking_blocks(state.say, list(state.thinking_blocks), state.response_ts)
+            )
+            state.thinking_sent = True
+        state.current_text = ""
+        state.text_message = None
+        state.text_updated_at = time.monotonic()
+
+    async def _start_tool_use_block(self, block: Any, state: "_StreamState") -> None:
+        """Remember the tool being called until its input is complete."""
+        # Text leading up to a tool call is a complete unit, so show it before the tool runs
+        await self._flush_text(state)
+        state.current_tool_use = {"id": block.id, "name": block.name}
+
+    async def _on_text(self, event: Any, state: "_StreamState") -> None:
+        """Accumulate text, showing long text blocks in Slack while they are still generating."""
+        if not event.text:
+            return
+        state.current_text += event.text
+        # Update the message at most once per interval to stay within chat.update rate limits
+        now = time.monotonic()
+        if state.slack_client is None or now - state.text_updated_at < self.TEXT_UPDATE_INTERVAL:
+            return
+        state.text_updated_at = now
+        formatted_text = self.markdown_to_slack(state.current_text)
+        if state.text_message is None:
+            await self._flush_text(state)
+            await self._wait_thinking_post(state)
+            state.text_message = await state.say(formatted_text)
+        else:
+            try:
+                await state.slack_client.chat_update(
+                    channel=state.text_message["channel"], ts=state.text_message["ts"], text=formatted_text
+                )
+            except SlackApiError as e:
+                # The final update at the end of the block will catch up
+                print(f"Warning: Could not update streaming text: {e}")
+
+    async def _on_block_stop(self, event: Any, state: "_StreamState") -> None:
+        """Handle completion of a content block."""
+        block = getattr(event, "content_block", None)
+        handler = self._block_stop_handlers.get(getattr(block, "type", None))
+        if handler is not None:
+            await handler(block, state)
+
+    async def _flush_text(self, state: "_StreamState") -> None:
+        """Post buffered text blocks to Slack as one message."""
+        if state.pending_text:
+            text = "\n\n".join(state.pending_text)
+            state.pending_text.clear()
+            await self._wait_thinking_post(state)
+            await state.say(self.markdown_to_slack(text))
+
+    async def _finish_thinking_block(self, block: Any, state: "_StreamState") -> None:
+        """Store a completed thinking block; it is posted to Slack once output starts."""
+        # The SDK accumulates thinking deltas and the signature into the completed block
+        thinking_block = {"type": "thinking", "thinking": block.thinking}
+        if block.signature:
+            thinking_block["signature"] = block.signature
+        state.thinking_blocks.append(thinking_block)
+
+    async def _finish_text_block(self, block: Any, state: "_StreamState") -> None:
+        """Send the complete text block to Slack and store it."""
+        if state.current_text:
+            if state.text_message is None:
+                # Short blocks are buffered so consecutive ones go out as a single message
+                state.pending_text.append(state.current_text)
+            else:
+                formatted_text = self.markdown_to_slack(state.current_text)
+                try:
+                    await state.slack_client.chat_update(
+                        channel=state.text_message["channel"], ts=state.text_message["ts"], text=formatted_text
+                    )
+                except SlackApiError as e:
+                    # The streamed message is stuck at a partial update, so post the whole block instead of losing it
+                    print(f"Warning: Could not finish streaming text, posting it in full: {e}")
+                    await state.say(formatted_text)
+            # Store completed text block
+            state.text_blocks.append({"type": "text", "text": state.current_text})
+            state.current_text = ""
+
+    async def _finish_tool_use_block(self, block: Any, state: "_StreamState") -> None:
+        """Store a completed tool use block and start executing the tool."""
+        current_tool_use = state.current_tool_use
+        if not current_tool_use:
+            return
+
+        await state.set_status(f"using {current_tool_use['name']}...")
+
+        # The SDK parses the streamed input JSON incrementally, so the completed block carries it as a dict
+        tool_input = block.input or {}
+
+        # Store tool use block for conversation history
+        tool_use_block = {
+            "type": "tool_use",
+            "id": current_tool_use["id"],
+            "name": current_tool_use["name"],
+            "input": tool_input,
+        }
+        state.tool_use_blocks.append(tool_use_block)
+
+        # Start the tool now and keep reading the stream; calls to different
+        # tools in the same turn run concurrently
+        previous_task = next(
+            (t for b, t in reversed(state.pending_tools) if b["name"] == tool_use_block["name"]),
+            None,
+        )
+        task = asyncio.create_task(self._execute_tool(state.run_tool, tool_use_block["name"], tool_input, previous_task))
+        state.pending_tools.append((tool_use_block, task))
+
+        state.current_tool_use = None
 
     async def _process_stream_response(
         self,
@@ -92,6 +530,7 @@ When a prompt has Slack's special syntax like <@USER_ID> or <#CHANNEL_ID>, you m
         say: Any,
         set_status: AsyncSetStatus,
         tool_registry: Any,
+        cancel_event: Optional[asyncio.Event] = None,
         cancel_check: Optional[Callable[[], bool]] = None,
     ) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         """Process streaming response, execute tools, and return content blocks and tool uses.
@@ -101,214 +540,131 @@ When a prompt has Slack's special syntax like <@USER_ID> or <#CHANNEL_ID>, you m
             say: Slack say function
             set_status: Status setter
             tool_registry: Tool registry for execution
-            cancel_check: Optional function to check if cancelled
+            cancel_event: Optional event that is set when the request is cancelled
+            cancel_check: Optional function to check if cancelled (kept for callers without an event)
 
         Returns:
-            Tuple of (content_blocks, tool_uses) where:
+            Tuple of (content_blocks, tool_results) where:
             - content_blocks: List of all content blocks for conversation history
-            - tool_uses: List of tool uses with their results
+            - tool_results: tool_result blocks for the next user message, in tool call order
         """
-        # Buffers for accumulating content
-        thinking_blocks = []  # Buffer thinking blocks until we start outputting
-        text_blocks = []
-        tool_use_blocks = []
-        tool_uses = []
-
-        # State tracking
-        current_thinking = ""
-        current_thinking_signature = None
-        current_text = ""
-        current_tool_use = None
-        current_tool_input = ""
-        thinking_sent = False  # Track if we've sent thinking blocks to Slack
-
-        async for event in stream:
-            # Check for cancellation
-            if cancel_check and cancel_check():
-                await stream.close()
-                raise asyncio.CancelledError("Processing cancelled")
-
-            if event.type == "thinking":
-                # Accumulate thinking content
-                current_thinking += event.thinking
-                # Check if signature is provided with the thinking event
-                if hasattr(event, "signature"):
-                    current_thinking_signature = event.signature
-                # Check in the snapshot which contains the accumulated state
-                if hasattr(event, "snapshot") and hasattr(event.snapshot, "signature"):
-                    current_thinking_signature = event.snapshot.signature
-
-            elif event.type == "content_block_start":
-                # Handle the start of a new content block
-                if hasattr(event, "content_block") and hasattr(event.content_block, "type"):
-                    if event.content_block.type == "thinking":
-                        current_thinking = ""
-                        # Extract signature if available at block start
-                        if hasattr(event.content_block, "signature"):
-                            current_thinking_signature = event.content_block.signature
-                        # Reset signature if starting a new thinking block without one
-                        elif not hasattr(event.content_block, "signature"):
-                            current_thinking_signature = None
-                    elif event.content_block.type == "text":
-                        # If we have buffered thinking blocks, send them now
-                        if thinking_blocks and not thinking_sent:
-                            for thinking_block in thinking_blocks:
-                                thinking_text = thinking_block["thinking"]
-                                quoted_lines = [f"> {line}" for line in thinking_text.split("\n")]
-                                quoted_text = "\n".join(quoted_lines)
-
-                                signature = thinking_block.get("signature", "")
-                                await say(
-                                    text=quoted_text,
-                                    attachments=[
-                                        {
-                                            "color": "#e0e0e0",  # Light gray for thinking
-                                            "text": "",  # Empty text, just using for metadata
-                                            "footer": f"thinking:{signature}" if signature else "thinking",
-                                            "ts": int(time.time()),
-                                        }
-                                    ],
-                                )
-                            thinking_sent = True
-                        current_text = ""
-                    elif event.content_block.type == "tool_use":
-                        current_tool_use = {
-                            "id": event.content_block.id,
-                            "name": event.content_block.name,
-                        }
-                        current_tool_input = ""
-
-            elif event.type == "text":
-                # Buffer text content instead of streaming immediately
-                if event.text:
-                    current_text += event.text
-
-            elif event.type == "input_json":
-                # Accumulate tool input JSON
-                if event.partial_json:
-                    current_tool_input += event.partial_json
-
-            elif event.type == "content_block_stop":
-                # Handle completion of a content block
-                if hasattr(event, "content_block"):
-                    block = event.content_block
-                    if hasattr(block, "type"):
-                        if block.type == "thinking":
-                            # Get signature from the completed block
-                            final_signature = current_thinking_signature
-                            if hasattr(block, "signature"):
-                                final_signature = block.signature
-
-                            # Store completed thinking block with signature from server
-                            thinking_block = {"type": "thinking", "thinking": current_thinking}
-                            if final_signature:
-                                thinking_block["signature"] = final_signature
-                            thinking_blocks.append(thinking_block)
-                            current_thinking = ""
-                            current_thinking_signature = None
-
-                        elif block.type == "text":
-                            # Send the complete text block to Slack
-                            if current_text:
-                                formatted_text = self.markdown_to_slack(current_text)
-                                await say(formatted_text)
-                                # Store completed text block
-                                text_blocks.append({"type": "text", "text": current_text})
-                                current_text = ""
-
-                        elif block.type == "tool_use":
-                            # Execute the tool
-                            if current_tool_use:
-                                await set_status(f"using {current_tool_use['name']}...")
-
-                                # Parse the accumulated JSON input
-                                import json
-
-                                try:
-                                    tool_input = json.loads(current_tool_input) if current_tool_input else {}
-                                except json.JSONDecodeError:
-                                    tool_input = {}
-
-                                # Execute tool
-                                if hasattr(tool_registry, "async_execute_tool"):
-                                    tool_result = await tool_registry.async_execute_tool(
-                                        current_tool_use["name"], tool_input
-                                    )
-                                else:
-                                    # Fallback to sync execution in thread pool
-                                    tool_result = await asyncio.get_event_loop().run_in_executor(
-                                        None, tool_registry.execute_tool, current_tool_use["name"], tool_input
-                                    )
-
-                                # Store tool use block for conversation history
-                                tool_use_block = {
-                                    "type": "tool_use",
-                                    "id": current_tool_use["id"],
-                                    "name": current_tool_use["name"],
-                                    "input": tool_input,
-                                }
-                                tool_use_blocks.append(tool_use_block)
-
-                                # Store tool use with result for follow-up
-                                tool_uses.append(
-                                    {
-                                        "tool_use_id": current_tool_use["id"],
-                                        "name": current_tool_use["name"],
-                                        "input": tool_input,
-                                        "result": tool_result,
-                                    }
-                                )
-
-                                # Show tool usage in Slack
-                                formatted_result = self.markdown_to_slack(tool_result)
-                                color = "#ff0000" if "error" in tool_result.lower() else "#2eb886"
-
-                                await say(
-                                    text=f"*Tool: {current_tool_use['name']}*",
-                                    attachments=[
-                                        {
-                                            "color": color,
-                                            "title": f"Tool: {current_tool_use['name']}",
-                                            "text": formatted_result,
-                                            "footer": f"Tool ID: {current_tool_use['id']}",
-                                            "ts": int(time.time()),
-                                        }
-                                    ],
-                                )
-
-                                current_tool_use = None
-                                current_tool_input = ""
-
-        # Send any remaining thinking blocks if they haven't been sent
-        if thinking_blocks and not thinking_sent:
-            for thinking_block in thinking_blocks:
-                thinking_text = thinking_block["thinking"]
-                quoted_lines = [f"> {line}" for line in thinking_text.split("\n")]
-                quoted_text = "\n".join(quoted_lines)
-
-                signature = thinking_block.get("signature", "")
-                await say(
-                    text=quoted_text,
-                    attachments=[
-                        {
-                            "color": "#e0e0e0",
-                            "text": "",
-                            "footer": f"thinking:{signature}" if signature else "thinking",
-                            "ts": int(time.time()),
-                        }
-                    ],
+        state = _StreamState(
+            say=say,
+            set_status=set_status,
+            run_tool=self._tool_runner(tool_registry),
+            response_ts=int(time.time()),
+            slack_client=getattr(say, "client", None),
+        )
+        tool_results = []
+        event_handlers = self._event_handlers
+
+        try:
+            async for event in stream:
+                # Check for cancellation
+                if self._is_cancelled(cancel_event, cancel_check):
+                    await stream.close()
+                    raise asyncio.CancelledError("Processing cancelled")
+
+                handler = event_handlers.get(event.type)
+                if handler is not None:
+                    await handler(event, state)
+
+            # Send any remaining text and thinking blocks if they haven't been sent
+            await self._flush_text(state)
+            await self._wait_thinking_post(state)
+            if state.thinking_blocks and not state.thinking_sent:
+                await self._post_thinking_blocks(say, state.thinking_blocks, state.response_ts)
+
+            # Wait for all tools, then collect their results in the original order. A failing tool
+            # becomes an error result so every tool_use still gets its tool_result.
+            results = await asyncio.gather(*(task for _, task in state.pending_tools), return_exceptions=True)
+            tool_attachments = []
+            for (tool_use_block, _), tool_result in zip(state.pending_tools, results):
+                if isinstance(tool_result, BaseException):
+                    tool_result = f"Error: Failed to execute tool {tool_use_block['name']}: {tool_result}"
+
+                # Store tool result for the follow-up request
+                tool_results.append({"type": "tool_result", "tool_use_id": tool_use_block["id"], "content": tool_result})
+
+                formatted_result = self.markdown_to_slack(tool_result)
+                color = "#ff0000" if _ERROR_RE.search(tool_result) else "#2eb886"
+                tool_attachments.append(
+                    {
+                        "color": color,
+                        "title": f"Tool: {tool_use_block['name']}",
+                        "text": formatted_result,
+                        "footer": f"Tool ID: {tool_use_block['id']}",
+                        "ts": state.response_ts,
+                    }
                 )
 
+            # Show tool usage in Slack, batching results into as few messages as possible.
+            # parse_assistant_message pairs each "*Tool: name*" line with the next tool attachment.
+            for start in range(0, len(tool_attachments), self.MAX_ATTACHMENTS_PER_MESSAGE):
+                end = start + self.MAX_ATTACHMENTS_PER_MESSAGE
+                batch = tool_attachments[start:end]
+                await say(text="\n".join(f"*{attachment['title']}*" for attachment in batch), attachments=batch)
+        finally:
+            # Don't leave tools or posts running if the stream was cancelled or failed
+            for _, task in state.pending_tools:
+                if not task.done():
+                    task.cancel()
+            if state.thinking_post is not None and not state.thinking_post.done():
+                state.thinking_post.cancel()
+
         # Construct properly ordered content blocks for conversation history
         # CRITICAL: Thinking blocks MUST come first for assistant messages
-        content_blocks = thinking_blocks + text_blocks + tool_use_blocks
+        content_blocks = state.thinking_blocks + state.text_blocks + state.tool_use_blocks
+
+        return content_blocks, tool_results
+
+    @staticmethod
+    def _is_cancelled(cancel_event: Optional[asyncio.Event], cancel_check: Optional[Callable[[], bool]]) -> bool:
+        """Check both cancellation signals."""
+        if cancel_event is not None and cancel_event.is_set():
+            return True
+        return cancel_check is not None and cancel_check()
+
+    async def _stream_round(
+        self,
+        request_params: Dict[str, Any],
+        say: Any,
+        set_status: AsyncSetStatus,
+        tool_registry: Any,
+        cancel_event: Optional[asyncio.Event] = None,
+        cancel_check: Optional[Callable[[], bool]] = None,
+    ) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Stream one request and process the response, aborting as soon as cancel_event is set."""
 
-        return content_blocks, tool_uses
+        async def run_round():
+            async with self.client.messages.stream(**request_params) as stream:
+                return await self._process_stream_response(
+                    stream, say, set_status, tool_registry, cancel_event, cancel_check
+                )
+
+        if cancel_event is None:
+            return await run_round()
+
+        # Race the round against the cancel event, so cancelling doesn't wait for the next stream event
+        round_task = asyncio.create_task(run_round())
+        cancel_wait = asyncio.create_task(cancel_event.wait())
+        try:
+            done, _ = await asyncio.wait({round_task, cancel_wait}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            cancel_wait.cancel()
+            if not round_task.done():
+                round_task.cancel()
+
+        if round_task in done:
+            return round_task.result()
+        # Let the round unwind (closing the stream and cancelling started tools) before reporting
+        await asyncio.wait([round_task])
+        raise asyncio.CancelledError("Request cancelled")
 
     async def async_message(
         self,
         set_status: AsyncSetStatus,
-        messages_in_thread: List[Dict[str, Any]],
+        messages_in_thread: Union[List[Dict[str, Any]], Awaitable[List[Dict[str, Any]]]],
         say: Any,
         tool_registry: Any,
         tools: Optional[List[Dict[str, Any]]] = None,
@@ -316,12 +672,14 @@ When a prompt has Slack's special syntax like <@USER_ID> or <#CHANNEL_ID>, you m
         thinking_budget: int = 16384,
         model: str = "claude-sonnet-4-20250514",
         cancel_check: Optional[Callable[[], bool]] = None,
+        cancel_event: Optional[asyncio.Event] = None,
     ) -> None:
         """Send messages with interleaved thinking mode and optional tools.
 
         Args:
             set_status: Slack status setter
-            messages_in_thread: Conversation messages
+            messages_in_thread: Conversation messages, or an awaitable resolving to them (e.g. a pending
+                thread fetch) so that request setup overlaps with it
             say: Say function to stream content to Slack
             tools: Optional list of tool definitions
             tool_registry: Tool registry for executing tools
@@ -329,33 +687,47 @@ When a prompt has Slack's special syntax like <@USER_ID> or <#CHANNEL_ID>, you m
             thinking_budget: Token budget for thinking
             model: Model to use
             cancel_check: Optional function to check if cancelled
+            cancel_event: Optional event that is set when the request is cancelled; unlike cancel_check,
+                it also aborts a request that is still waiting on the API
         """
         if system_content is None:
             system_content = self._load_system_prompt()
 
         await set_status("is thinking...")
 
-        messages = []
-        messages.extend(messages_in_thread)
+        # Prepare system prompt with cache control for the entire prompt
+        system_with_cache = self._system_blocks(system_content)
+
+        # Add cache control to tools if they exist
+        # Tools typically don't change, so caching them saves tokens. A registry's list is built once and reused;
+        # extra tools passed per call are rare and rebuilt each time.
+        memoize_tools = tool_registry is not None and not tools
+        tools_with_cache = self._registry_tool_blocks.get(tool_registry) if memoize_tools else None
 
-        # Get tool schemas dynamically from the registry
-        tools_list = []
-        if tool_registry:
-            tools_list = tool_registry.get_tool_schemas()
+        if tools_with_cache is None:
+            # Get tool schemas dynamically from the registry
+            tools_list = []
+            if tool_registry:
+                tools_list = tool_registry.get_tool_schemas()
 
-        # Add any additional custom tools provided
-        if tools:
-            tools_list.extend(tools)
+            # Add any additional custom tools provided
+            if tools:
+                tools_list.extend(tools)
 
-        # Prepare system prompt with cache control for the entire prompt
-        # Since we use hour precision, the entire prompt can be cached
-        system_with_cache = [{"type": "text", "text": system_content, "cache_control": {"type": "ephemeral"}}]  # Cache
+            # Truncated tool results can be read back through fetch_tool_result
+            if tool_registry and self._max_tool_result_chars > 0:
+                tools_list.append(self.FETCH_TOOL_RESULT_SCHEMA)
 
-        # Add cache control to tools if they exist
-        # Tools typically don't change, so caching them saves tokens
-        tools_with_cache = None
-        if tools_list:
-            tools_with_cache = [{**tool, "cache_control": {"type": "ephemeral"}} for tool in tools_list]
+            tools_with_cache = self._tool_blocks(tools_list) if tools_list else []
+            if memoize_tools:
+                self._registry_tool_blocks[tool_registry] = tools_with_cache
+
+        # Resolve the conversation last so the setup above overlaps with a pending thread fetch
+        if inspect.isawaitable(messages_in_thread):
+            messages_in_thread = await messages_in_thread
+
+        # Tool rounds are appended to this list, so copy rather than extend the caller's history
+        messages = list(messages_in_thread)
 
         # Prepare request parameters
         request_params = {
@@ -363,35 +735,48 @@ When a prompt has Slack's special syntax like <@USER_ID> or <#CHANNEL_ID>, you m
             "messages": messages,
             "model": model,
             "system": system_with_cache,  # Use the cached system prompt
-            "tools": tools_with_cache if tools_with_cache else tools_list,
+            "tools": tools_with_cache,
             "extra_headers": {"anthropic-beta": "interleaved-thinking-2025-05-14"},
             "thinking": {"type": "enabled", "budget_tokens": thinking_budget},
         }
 
         # Check for cancellation before API call
-        if cancel_check and cancel_check():
+        if self._is_cancelled(cancel_event, cancel_check):
             raise asyncio.CancelledError("Request cancelled before API call")
 
+        # Identical requests within the cache TTL are answered from the response cache
+        cache_key = None
+        if self._response_cache_ttl > 0:
+            cache_key = self._response_cache_key(model, system_content, tools_with_cache, messages, thinking_budget)
+            cached_blocks = self._get_cached_response(cache_key)
+            if cached_blocks is not None:
+                await self._replay_response(say, cached_blocks)
+                return
+
         # Initial streaming response
         content_blocks = []
-        tool_uses = []
+        tool_results = []
 
-        async with self.client.messages.stream(**request_params) as stream:
-            # Process streaming response
-            content_blocks, tool_uses = await self._process_stream_response(
-                stream, say, set_status, tool_registry, cancel_check
-            )
+        content_blocks, tool_results = await self._stream_round(
+            request_params, say, set_status, tool_registry, cancel_event, cancel_check
+        )
 
         if not content_blocks:
             await say("I'm distracted.")
             return
 
+        # Only cache answers without tool calls, since tools have side effects and time-dependent results
+        if cache_key is not None and not tool_results:
+            self._cache_response(cache_key, content_blocks)
+
         # Continue processing while there are tool uses
         tool_round = 0
+        seen_tool_results: Dict[bytes, str] = {}
+        cache_breakpoint: Optional[Dict[str, Any]] = None
 
-        while tool_uses:
+        while tool_results:
             # Check for cancellation
-            if cancel_check and cancel_check():
+            if self._is_cancelled(cancel_event, cancel_check):
                 raise asyncio.CancelledError("Request cancelled during tool processing")
 
             tool_round += 1
@@ -401,76 +786,23 @@ When a prompt has Slack's special syntax like <@USER_ID> or <#CHANNEL_ID>, you m
             # Content blocks are already properly ordered (thinking first) from _process_stream_response
             messages.append({"role": "assistant", "content": content_blocks})
 
-            # Add tool results as user message
-            tool_result_content = []
-            for tool_use in tool_uses:
-                tool_result_content.append(
-                    {"type": "tool_result", "tool_use_id": tool_use["tool_use_id"], "content": tool_use["result"]}
-                )
-            messages.append({"role": "user", "content": tool_result_content})
-
-            # Get Claude's follow-up response
-            follow_up_params = request_params.copy()
-            # Create a fresh copy of messages to ensure proper structure
-            follow_up_messages = []
-            for msg in messages:
-                if msg["role"] == "assistant" and isinstance(msg.get("content"), list):
-                    # Ensure assistant messages have proper structure for thinking mode
-                    # Reorder content to have thinking blocks first
-                    content = msg["content"]
-                    thinking_blocks = [block for block in content if block.get("type") == "thinking"]
-                    text_blocks = [block for block in content if block.get("type") == "text"]
-                    tool_use_blocks = [block for block in content if block.get("type") == "tool_use"]
-
-                    # Only reorder if we have content blocks
-                    if thinking_blocks or text_blocks or tool_use_blocks:
-                        reordered_content = thinking_blocks + text_blocks + tool_use_blocks
-                        follow_up_messages.append({"role": msg["role"], "content": reordered_content})
-                    else:
-                        follow_up_messages.append(msg)
-                else:
-                    follow_up_messages.append(msg)
-
-            follow_up_params["messages"] = follow_up_messages
-
-            # Stream follow-up response
-            async with self.client.messages.stream(**follow_up_params) as stream:
-                # Process follow-up response and check for more tool uses
-                content_blocks, tool_uses = await self._process_stream_response(
-                    stream, say, set_status, tool_registry, cancel_check
-                )
+            # Add tool results as user message; Slack already shows their full output
+            self._compact_tool_results(content_blocks, tool_results, seen_tool_results)
+            messages.append({"role": "user", "content": tool_results})
+
+            # Move the conversation cache breakpoint to the newest tool result, so the next round reads
+            # everything before it from the prompt cache (only one is kept: the API allows 4 in total)
+            if cache_breakpoint is not None:
+                del cache_breakpoint["cache_control"]
+            cache_breakpoint = tool_results[-1]
+            cache_breakpoint["cache_control"] = {"type": "ephemeral"}
+
+            # Stream follow-up response; request_params["messages"] is the same list we just appended to
+            content_blocks, tool_results = await self._stream_round(
+                request_params, say, set_status, tool_registry, cancel_event, cancel_check
+            )
 
     @staticmethod
     def markdown_to_slack(content: str) -> str:
         """Convert markdown to Slack-compatible mrkdwn format."""
-        # First convert headers to bold text
-        content = re.sub(r"^#{1,6}\s+(.+)$", r"*\1*", content, flags=re.MULTILINE)
-
-        # Split the input string into parts based on code blocks and inline code
-        parts = re.split(r"(?s)(```.+?```|`[^`\n]+?`)", content)
-
-        # Apply the bold, italic, and strikethrough formatting to text not within code
-        result = ""
-        for part in parts:
-            if part.startswith("```") or part.startswith("`"):
-                result += part
-            else:
-                # Process formatting - order matters to avoid conflicts!
-                # 1. Bold-italic (***) first - most specific pattern
-                part = re.sub(r"\*\*\*(.+?)\*\*\*", r"_*\1*_", part)
-
-                # 2. Italic (*) BEFORE bold (**) to avoid confusion after conversion
-                # Match single asterisks that are not adjacent to other asterisks
-                part = re.sub(r"(?<![*])\*([^*\n]+?)\*(?![*])", r"_\1_", part)
-
-                # 3. Bold (**) - now safe to convert without affecting italic
-                part = re.sub(r"\*\*(.+?)\*\*", r"*\1*", part)
-
-                # 4. Alternative bold (__)
-                part = re.sub(r"__(.+?)__", r"*\1*", part)
-
-                # 5. Strikethrough (~~)
-                part = re.sub(r"~~(.+?)~~", r"~\1~", part)
-
-                result += part
-        return result
+        return markdown_to_slack(content)
@@ -2,7 +2,11 @@
 
 import asyncio
 import logging
-from typing import Dict, Optional, Any, List, Callable
+import re
+from collections import OrderedDict, deque
+from enum import IntEnum
+from operator import itemgetter
+from typing import Dict, Optional, Any, List, Callable, Coroutine, Deque, Set
 from dataclasses import dataclass, field
 import time
 
@@ -11,8 +15,13 @@ from slack_bolt.context.say.async_say import AsyncSay
 from slack_bolt.context.set_status.async_set_status import AsyncSetStatus
 from slack_sdk.web.async_client import AsyncWebClient
 
+# Bot posts that are UI chrome rather than assistant output, skipped when rebuilding history
+_SKIP_EXACT_TEXTS = frozenset({"How can I help you?", "Processing..."})
+_SKIP_PREFIXES = (":octagonal_sign:", ":information_source:")
+_MODE_SWITCH_RE = re.compile(r"Mode Activated|Switched (?:back )?to normal mode")
 
-@dataclass
+
+@dataclass(slots=True)
 class ThreadContext:
     """Context for processing a thread message."""
 
@@ -21,106 +30,158 @@ class ThreadContext:
     say: AsyncSay
     set_status: AsyncSetStatus
     logger: logging.Logger
+    # Copied from the Bolt context once, since they are read on every queue and lookup step
+    channel_id: Optional[str] = field(init=False)
+    thread_ts: Optional[str] = field(init=False)
+    user_id: Optional[str] = field(init=False)
 
-    @property
-    def channel_id(self) -> Optional[str]:
-        """Get channel ID from context."""
-        return self.context.channel_id
+    def __post_init__(self):
+        self.channel_id = self.context.channel_id
+        self.thread_ts = self.context.thread_ts
+        self.user_id = self.context.user_id
 
-    @property
-    def thread_ts(self) -> Optional[str]:
-        """Get thread timestamp from context."""
-        return self.context.thread_ts
 
-    @property
-    def user_id(self) -> Optional[str]:
-        """Get user ID from context."""
-        return self.context.user_id
+class ConversationStatus(IntEnum):
+    """Lifecycle of a conversation loop."""
 
+    IDLE = 0  # Waiting for the next message
+    PROCESSING = 1  # Handling a message
+    CANCELLING = 2  # Stopped by a user while processing; the loop is winding down
+    DEAD = 3  # The loop has exited
 
-@dataclass
+
+@dataclass(slots=True)
 class ConversationState:
     """State for a single conversation thread."""
 
     channel_id: str
     thread_ts: str
-    processing_queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    # Single producer (process_thread_message) and single consumer (_conversation_loop), so a plain
+    # deque plus a wake-up event is enough
+    processing_queue: Deque[ThreadContext] = field(default_factory=deque)
+    queue_ready: asyncio.Event = field(default_factory=asyncio.Event)
     task: Optional[asyncio.Task] = None
-    is_active: bool = True
-    is_processing: bool = False
+    status: ConversationStatus = ConversationStatus.IDLE
+    cancel_event: asyncio.Event = field(default_factory=asyncio.Event)  # Set when the user stops the request
     start_time: float = field(default_factory=time.time)
     last_activity: float = field(default_factory=time.time)
     model: str = "claude-sonnet-4-20250514"
     current_context: Optional[ThreadContext] = None
     stop_message_ts: Optional[str] = None  # Track stop button message
+    history: List[Dict[str, Any]] = field(default_factory=list)  # Thread messages parsed on earlier turns
+    history_ts: Optional[str] = None  # ts of the newest Slack message already parsed into history
+
+    @property
+    def is_active(self) -> bool:
+        """Whether the conversation loop is still accepting messages."""
+        return self.status <= ConversationStatus.PROCESSING
+
+    @property
+    def is_processing(self) -> bool:
+        """Whether a message is being handled (including one that is being cancelled)."""
+        return self.status in (ConversationStatus.PROCESSING, ConversationStatus.CANCELLING)
 
 
 class ConversationManager:
     """Manages conversation coroutines for all Slack threads."""
 
+    LOCK_STRIPES = 16
+    CLEANUP_INTERVAL = 300  # Seconds between idle conversation sweeps
+
     def __init__(self, parse_assistant_message: Callable):
-        self.conversations: Dict[str, ConversationState] = {}
+        # Kept in last_activity order (oldest first) so idle cleanup only visits expired entries
+        self.conversations: "OrderedDict[str, ConversationState]" = OrderedDict()
         self.parse_assistant_message = parse_assistant_message
         self.logger = logging.getLogger(__name__)
-        self._cleanup_task: Optional[asyncio.Task] = None
-        self._lock = asyncio.Lock()  # For thread-safe operations
+        self._cleanup_handle: Optional[asyncio.TimerHandle] = None
+        # The event loop only keeps weak references to tasks, so background work is held here until done
+        self._background_tasks: Set[asyncio.Task] = set()
+        # Conversations are guarded by one of several locks picked by key, so a slow Slack call
+        # made while holding the lock for one thread doesn't stall unrelated threads
+        self._locks = [asyncio.Lock() for _ in range(self.LOCK_STRIPES)]
 
     def _get_key(self, channel_id: str, thread_ts: str) -> str:
         """Generate unique key for a conversation."""
         return f"{channel_id}:{thread_ts}"
 
+    def _lock_for(self, key: str) -> asyncio.Lock:
+        """Get the lock guarding a conversation key."""
+        return self._locks[hash(key) % self.LOCK_STRIPES]
+
+    def _spawn(self, coro: Coroutine) -> asyncio.Task:
+        """Run a coroutine in the background, keeping a reference to it until it finishes."""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    def _touch(self, key: str, conv: ConversationState):
+        """Record activity on a conversation and move it to the recent end."""
+        conv.last_activity = time.time()
+        if key in self.conversations:
+            self.conversations.move_to_end(key)
+
     async def start(self):
         """Start the conversation manager and cleanup task."""
-        self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+        self._schedule_cleanup()
         self.logger.info("ConversationManager started")
 
     async def stop(self):
         """Stop all conversations and cleanup task."""
-        if self._cleanup_task:
-            self._cleanup_task.cancel()
-            try:
-                await self._cleanup_task
-            except asyncio.CancelledError:
-                pass
-
-        # Cancel all active conversations
+        if self._cleanup_handle:
+            self._cleanup_handle.cancel()
+            self._cleanup_handle = None
+
+        # Cancel all active conversations; nothing is awaited in the loop, so no lock is needed
         tasks = []
-        async with self._lock:
-            for conv in self.conversations.values():
-                if conv.task and not conv.task.done():
-                    conv.task.cancel()
-                    tasks.append(conv.task)
+        for conv in self.conversations.values():
+            if conv.task and not conv.task.done():
+                conv.task.cancel()
+                tasks.append(conv.task)
+
+        # Let pending stop button deletions and a running cleanup sweep finish
+        tasks.extend(self._background_tasks)
 
         if tasks:
             await asyncio.gather(*tasks, return_exceptions=True)
 
         self.logger.info("ConversationManager stopped")
 
-    async def _cleanup_loop(self):
-        """Periodically clean up inactive conversations."""
-        while True:
-            try:
-                await asyncio.sleep(300)  # Check every 5 minutes
-                await self._cleanup_inactive_conversations()
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                self.logger.error(f"Error in cleanup loop: {e}")
+    def _schedule_cleanup(self):
+        """Arm a timer for the next idle conversation sweep.
+
+        A timer handle rather than a sleeping task, so nothing stays alive between sweeps.
+        """
+        loop = asyncio.get_running_loop()
+        self._cleanup_handle = loop.call_later(self.CLEANUP_INTERVAL, lambda: self._spawn(self._run_cleanup()))
+
+    async def _run_cleanup(self):
+        """Clean up inactive conversations, then arm the next sweep unless stopped."""
+        try:
+            await self._cleanup_inactive_conversations()
+        except Exception as e:
+            self.logger.error(f"Error in cleanup loop: {e}")
+
+        if self._cleanup_handle is not None:
+            self._schedule_cleanup()
 
     async def _cleanup_inactive_conversations(self, max_idle_time: int = 3600):
         """Remove conversations that have been idle for too long."""
         current_time = time.time()
         to_remove = []
 
-        async with self._lock:
-            for key, conv in self.conversations.items():
-                if not conv.is_processing and (current_time - conv.last_activity) > max_idle_time:
-                    if conv.task and not conv.task.done():
-                        conv.task.cancel()
-                    to_remove.append(key)
+        # The scan doesn't await, so it can't interleave with other coroutines. Entries are in
+        # activity order, so it stops at the first one that is still fresh.
+        for key, conv in self.conversations.items():
+            if (current_time - conv.last_activity) <= max_idle_time:
+                break
+            if not conv.is_processing:
+                if conv.task and not conv.task.done():
+                    conv.task.cancel()
+                to_remove.append(key)
 
         for key in to_remove:
-            async with self._lock:
+            async with self._lock_for(key):
                 if key in self.conversations:
                     del self.conversations[key]
             self.logger.info(f"Removed inactive conversation: {key}")
@@ -135,9 +196,14 @@ class ConversationManager:
         key = self._get_key(thread_context.channel_id, thread_context.thread_ts)
 
         # Get or create conversation state
-        async with self._lock:
-            if key not in self.conversations:
+        async with self._lock_for(key):
+            conv = self.conversations.get(key)
+            # A stopped or timed-out loop no longer reads its queue, so start a fresh one
+            if conv is None or not conv.is_active:
+                previous = conv
                 conv = ConversationState(channel_id=thread_context.channel_id, thread_ts=thread_context.thread_ts)
+                if previous is not None:
+                    conv.model = previous.model
                 self.conversations[key] = conv
 
                 # Start the conversation coroutine
@@ -145,12 +211,11 @@ class ConversationManager:
                     self._conversation_loop(conv, tool_registry, llm), name=f"conversation-{key}"
                 )
                 thread_context.logger.info(f"Created new conversation: {key}")
-            else:
-                conv = self.conversations[key]
 
         # Queue the context for processing
-        await conv.processing_queue.put(thread_context)
-        conv.last_activity = time.time()
+        conv.processing_queue.append(thread_context)
+        conv.queue_ready.set()
+        self._touch(key, conv)
 
     async def _conversation_loop(self, conv: ConversationState, tool_registry: Any, llm: Any):
         """Main coroutine loop for a single conversation."""
@@ -161,11 +226,14 @@ class ConversationManager:
                 thread_context = None  # Initialize to avoid unbound variable
                 try:
                     # Wait for next context with timeout
-                    thread_context = await asyncio.wait_for(conv.processing_queue.get(), timeout=3600)  # 1 hour timeout
+                    while not conv.processing_queue:
+                        conv.queue_ready.clear()
+                        await asyncio.wait_for(conv.queue_ready.wait(), timeout=3600)  # 1 hour timeout
+                    thread_context = conv.processing_queue.popleft()
 
-                    conv.is_processing = True
+                    conv.status = ConversationStatus.PROCESSING
                     conv.current_context = thread_context
-                    conv.last_activity = time.time()
+                    self._touch(self._get_key(conv.channel_id, conv.thread_ts), conv)
 
                     # Process the thread
                     await self._process_thread(conv, thread_context, tool_registry, llm)
@@ -186,74 +254,64 @@ class ConversationManager:
                         await thread_context.say(f":warning: Error: {str(e)}")
 
                 finally:
-                    conv.is_processing = False
+                    if conv.status == ConversationStatus.PROCESSING:
+                        conv.status = ConversationStatus.IDLE
                     conv.current_context = None
 
         except asyncio.CancelledError:
             raise
         finally:
-            conv.is_active = False
+            conv.status = ConversationStatus.DEAD
             self.logger.info(f"Conversation loop ended for {conv.channel_id}:{conv.thread_ts}")
 
     async def _process_thread(self, conv: ConversationState, thread_context: ThreadContext, tool_registry: Any, llm: Any):
         """Process a thread by fetching all messages and calling LLM."""
-        await thread_context.set_status("is thinking...")
-
-        # Show processing indicator with stop button
-        stop_message = await thread_context.say(
-            blocks=[
-                {"type": "section", "text": {"type": "mrkdwn", "text": ":hourglass_flowing_sand: Processing..."}},
-                {
-                    "type": "actions",
-                    "elements": [
-                        {
-                            "type": "button",
-                            "text": {"type": "plain_text", "text": ":octagonal_sign: Stop", "emoji": True},
-                            "value": f"{conv.channel_id}:{conv.thread_ts}",
-                            "action_id": "emergency_stop",
-                            "style": "danger",
-                        }
-                    ],
-                },
-            ],
-            text="Processing...",
-        )
-
-        if stop_message and "ts" in stop_message:
-            conv.stop_message_ts = stop_message["ts"]
+        # Fetch all thread messages in the background. The fetch overlaps with posting the status and
+        # stop button, and the LLM prepares its request while pages arrive.
+        fetch_task = asyncio.create_task(self._fetch_thread_messages(thread_context, conv))
 
         try:
-            # Fetch all thread messages (following the current pattern)
-            messages_in_thread = await self._fetch_thread_messages(thread_context)
+            await thread_context.set_status("is thinking...")
+
+            # Show processing indicator with stop button
+            stop_message = await thread_context.say(
+                blocks=[
+                    {"type": "section", "text": {"type": "mrkdwn", "text": ":hourglass_flowing_sand: Processing..."}},
+                    {
+                        "type": "actions",
+                        "elements": [
+                            {
+                                "type": "button",
+                                "text": {"type": "plain_text", "text": ":octagonal_sign: Stop", "emoji": True},
+                                "value": f"{conv.channel_id}:{conv.thread_ts}",
+                                "action_id": "emergency_stop",
+                                "style": "danger",
+                            }
+                        ],
+                    },
+                ],
+                text="Processing...",
+            )
+
+            if stop_message and "ts" in stop_message:
+                conv.stop_message_ts = stop_message["ts"]
 
             # Check model preference
             model = conv.model
 
-            # Create cancel check function
-            def cancel_check():
-                return not conv.is_active
-
-            # Debug log messages before sending
-            self.logger.debug(f"Sending {len(messages_in_thread)} messages to Claude")
-            for i, msg in enumerate(messages_in_thread):
-                self.logger.debug(f"Message {i}: role={msg['role']}")
-                if msg["role"] == "assistant" and isinstance(msg.get("content"), list):
-                    for j, block in enumerate(msg["content"]):
-                        self.logger.debug(f"  Block {j}: type={block.get('type')}")
-
             # Call async LLM
             await llm.async_message(
                 set_status=thread_context.set_status,
-                messages_in_thread=messages_in_thread,
+                messages_in_thread=fetch_task,
                 say=thread_context.say,
                 tool_registry=tool_registry,
                 model=model,
-                cancel_check=cancel_check,
+                cancel_event=conv.cancel_event,
             )
 
-            # Remove stop button on success
+            # Remove stop button on success, without holding up the next queued message
             if conv.stop_message_ts:
-                await thread_context.client.chat_delete(channel=conv.channel_id, ts=conv.stop_message_ts)
+                self._spawn(self._delete_stop_message(thread_context, conv.channel_id, conv.stop_message_ts))
                 conv.stop_message_ts = None
 
         except asyncio.CancelledError:
@@ -271,97 +329,139 @@ class ConversationManager:
                     pass
             raise
 
-    async def _fetch_thread_messages(self, thread_context: ThreadContext) -> List[Dict[str, Any]]:
-        """Fetch all messages in a thread with pagination support."""
+        finally:
+            # The status, stop button or LLM call may have failed before the fetch was awaited: don't leave it
+            # running, and retrieve its outcome so a fetch error isn't reported as never retrieved
+            if not fetch_task.done():
+                fetch_task.cancel()
+            await asyncio.wait([fetch_task])
+            if not fetch_task.cancelled():
+                fetch_task.exception()
+
+    async def _delete_stop_message(self, thread_context: ThreadContext, channel_id: str, ts: str):
+        """Delete a stop button message, logging instead of raising on failure."""
+        try:
+            await thread_context.client.chat_delete(channel=channel_id, ts=ts)
+        except Exception as e:
+            self.logger.warning(f"Could not delete stop button message {ts}: {e}")
+
+    async def _fetch_thread_messages(
+        self, thread_context: ThreadContext, conv: Optional[ConversationState] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch all messages in a thread with pagination support.
+
+        When a conversation state is given, only replies newer than the ones parsed on
+        earlier turns are fetched and parsed; they are appended to conv.history.
+        """
+        history_ts = conv.history_ts if conv else None
+        history = conv.history if conv else None
         messages_in_thread: List[Dict[str, Any]] = []
-        all_messages: List[Dict[str, Any]] = []
-        cursor = None
+        newest_ts = None
 
-        # Keep fetching until we have all messages
-        while True:
-            params = {
-                "channel": thread_context.channel_id,
-                "ts": thread_context.thread_ts,
-                "limit": 10,  # Max allowed per request
-            }
+        params = {
+            "channel": thread_context.channel_id,
+            "ts": thread_context.thread_ts,
+            "limit": 1000,  # Max allowed per request
+        }
 
-            if cursor:
-                params["cursor"] = cursor
+        if history_ts:
+            params["oldest"] = history_ts
 
-            replies = await thread_context.client.conversations_replies(**params)
-            messages = replies.get("messages", [])
-
-            if messages:
-                all_messages.extend(messages)
-
-            # Check if there are more messages
-            response_metadata = replies.get("response_metadata", {})
-            cursor = response_metadata.get("next_cursor")
+        # Pages are requested one ahead: the next page is in flight while the current one is parsed
+        next_page = asyncio.create_task(thread_context.client.conversations_replies(**params))
+        try:
+            while next_page:
+                replies = await next_page
+                next_page = None
+
+                # Check if there are more messages
+                response_metadata = replies.get("response_metadata", {})
+                cursor = response_metadata.get("next_cursor")
+
+                if cursor:
+                    next_page = asyncio.create_task(thread_context.client.conversations_replies(**params, cursor=cursor))
+                    await asyncio.sleep(0)  # Let the request go out before parsing
+
+                # Slack returns replies oldest first, so pages can be parsed as they arrive. Sort
+                # within the page anyway; ts values are fixed-width decimal strings
+                # ("1699999999.000123"), so lexicographic order matches numeric order.
+                messages = sorted(replies.get("messages", []), key=itemgetter("ts"))
+
+                # The thread parent is returned even with "oldest"; drop everything already in history
+                if history_ts:
+                    messages = [message for message in messages if message["ts"] > history_ts]
+
+                if messages:
+                    newest_ts = messages[-1]["ts"]
+                    messages_in_thread.extend(self._parse_thread_messages(messages))
+        finally:
+            if next_page and not next_page.done():
+                next_page.cancel()
+
+        if conv and conv.history is history:
+            history.extend(messages_in_thread)
+            if newest_ts:
+                conv.history_ts = newest_ts
+            # Not copied: the LLM builds its own request list from this and never mutates it
+            messages_in_thread = history
+        elif conv:
+            # The history was invalidated by an edit while this fetch ran; answer from what was read and let
+            # the next turn fetch the thread again
+            messages_in_thread = history + messages_in_thread
+
+        # Debug log messages before sending; skip the per-block walk entirely unless DEBUG is on
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Sending %d messages to Claude", len(messages_in_thread))
+            for i, msg in enumerate(messages_in_thread):
+                self.logger.debug("Message %d: role=%s", i, msg["role"])
+                if msg["role"] == "assistant" and isinstance(msg.get("content"), list):
+                    for j, block in enumerate(msg["content"]):
+                        self.logger.debug("  Block %d: type=%s", j, block.get("type"))
 
-            if not cursor:
-                break
+        return messages_in_thread
 
-        # Sort messages by timestamp
-        all_messages.sort(key=lambda m: float(m.get("ts", 0)))
+    def _parse_thread_messages(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Convert Slack thread messages into conversation messages for the LLM."""
+        messages_in_thread: List[Dict[str, Any]] = []
 
         # Parse messages into conversation format
-        for message in all_messages:
+        for message in messages:
             if message.get("bot_id") is None:
                 # User message
                 messages_in_thread.append({"role": "user", "content": message["text"]})
-            else:
-                # Bot message - but only include if it's actually from Claude
-                # Skip known non-Claude messages
-                text = message.get("text", "")
-
-                # Skip empty messages
-                if not text:
-                    continue
-
-                # Skip greeting messages
-                if text == "How can I help you?":
-                    continue
-
-                # Skip stop/status messages
-                if text.startswith(":octagonal_sign:") or text.startswith(":information_source:"):
-                    continue
-
-                # Skip mode switch messages
-                if "Mode Activated" in text or "Switched to normal mode" in text or "Switched back to normal mode" in text:
-                    continue
-
-                # Skip hourglass/processing messages
-                if text == "Processing...":
-                    continue
-
-                # Skip processing indicator messages (they have blocks with buttons)
-                blocks = message.get("blocks", [])
-                if blocks and any(block.get("type") == "actions" for block in blocks):
-                    continue
-
-                # Assistant message - parse to recover thinking blocks
-                attachments = message.get("attachments", [])
-                parse_result = self.parse_assistant_message(text, attachments)
-
-                # Handle the two possible return types
-                if isinstance(parse_result, tuple):
-                    content_blocks, tool_results = parse_result
-                    if content_blocks:
-                        messages_in_thread.append({"role": "assistant", "content": content_blocks})
-
-                    if tool_results:
-                        tool_result_content = []
-                        for tool_result in tool_results:
-                            tool_result_content.append(
-                                {
-                                    "type": "tool_result",
-                                    "tool_use_id": tool_result["tool_use_id"],
-                                    "content": tool_result["result"],
-                                }
-                            )
-                        messages_in_thread.append({"role": "user", "content": tool_result_content})
-                elif parse_result:
-                    messages_in_thread.append({"role": "assistant", "content": parse_result})
+                continue
+
+            # Bot message - but only include if it's actually from Claude
+            # Skip known non-Claude messages
+            text = message.get("text")
+
+            # Skip empty, greeting/processing, stop/status and mode switch messages
+            if not text or text in _SKIP_EXACT_TEXTS or text.startswith(_SKIP_PREFIXES) or _MODE_SWITCH_RE.search(text):
+                continue
+
+            # Skip processing indicator messages (they have blocks with buttons). The button is
+            # not the first block, so every block is checked.
+            blocks = message.get("blocks")
+            if blocks and any(block.get("type") == "actions" for block in blocks):
+                continue
+
+            # Assistant message - parse to recover thinking blocks
+            parse_result = self.parse_assistant_message(text, message.get("attachments", []))
+
+            # Handle the two possible return types
+            if isinstance(parse_result, tuple):
+                content_blocks, tool_results = parse_result
+                if content_blocks:
+                    messages_in_thread.append({"role": "assistant", "content": content_blocks})
+
+                if tool_results:
+                    tool_result_content = [
+                        {"type": "tool_result", "tool_use_id": tool_result["tool_use_id"], "content": tool_result["result"]}
+                        for tool_result in tool_results
+                    ]
+                    messages_in_thread.append({"role": "user", "content": tool_result_content})
+            elif parse_result:
+                messages_in_thread.append({"role": "assistant", "content": parse_result})
 
         return messages_in_thread
 
@@ -369,18 +469,19 @@ class ConversationManager:
         """Cancel an active conversation."""
         key = self._get_key(channel_id, thread_ts)
 
-        async with self._lock:
+        async with self._lock_for(key):
             if key not in self.conversations:
                 return False
 
             conv = self.conversations[key]
 
-            # Check if conversation is processing
-            if not conv.is_processing:
+            # Check if conversation is processing and not already being cancelled
+            if conv.status != ConversationStatus.PROCESSING:
                 return False
 
             # Mark as inactive
-            conv.is_active = False
+            conv.status = ConversationStatus.CANCELLING
+            conv.cancel_event.set()
 
             # Cancel the task
             if conv.task and not conv.task.done():
@@ -397,6 +498,18 @@ class ConversationManager:
 
         return False
 
+    def invalidate_history(self, channel_id: str, thread_ts: str, ts: str):
+        """Drop a conversation's parsed history when a message already in it is edited or deleted.
+
+        The history is replaced rather than cleared, since a running turn may still be reading it.
+        """
+        conv = self.conversations.get(self._get_key(channel_id, thread_ts))
+        if conv is None or conv.history_ts is None or ts > conv.history_ts:
+            return
+        conv.history = []
+        conv.history_ts = None
+        self.logger.info(f"Invalidated history for {channel_id}:{thread_ts} after a change to message {ts}")
+
     def set_model_preference(self, channel_id: str, thread_ts: str, model: str):
         """Set the model preference for a conversation."""
         key = self._get_key(channel_id, thread_ts)
@@ -406,4 +519,4 @@ class ConversationManager:
 
     def get_active_conversations(self) -> Dict[str, ConversationState]:
         """Get all active conversations."""
-        return {k: v for k, v in self.conversations.items() if v.is_active and v.is_processing}
+        return {k: v for k, v in self.conversations.items() if v.status == ConversationStatus.PROCESSING}
@@ -0,0 +1,56 @@
+"""Shared formatting utilities for converting model output to Slack mrkdwn."""
+
+import re
+
+# Markdown to Slack mrkdwn conversion patterns, compiled once at import
+_HEADER_RE = re.compile(r"^#{1,6}\s+(.+)$", re.MULTILINE)
+_CODE_SPLIT_RE = re.compile(r"(?s)(```.+?```|`[^`\n]+?`)")
+# Inline formatting alternatives, matched in a single left-to-right scan.
+# Order matters: bold-italic (***) before bold (**) before italic (*).
+_INLINE_RE = re.compile(
+    r"\*\*\*(?P<bold_italic>.+?)\*\*\*"
+    r"|\*\*(?P<bold>.+?)\*\*"
+    r"|(?<![*])\*(?P<italic>[^*\n]+?)\*(?![*])"
+    r"|__(?P<alt_bold>.+?)__"
+    r"|~~(?P<strike>.+?)~~"
+)
+# Characters that every conversion above needs; text without any of them is returned unchanged
+_MARKDOWN_CHARS = frozenset("*_~`#")
+
+
+def _inline_to_slack(match: re.Match) -> str:
+    """Replace one inline markdown span with its Slack mrkdwn equivalent."""
+    kind = match.lastgroup
+    # Spans can nest (e.g. **bold *italic***), so convert the inner text too
+    inner = _INLINE_RE.sub(_inline_to_slack, match.group(kind))
+    if kind == "bold_italic":
+        return f"_*{inner}*_"
+    if kind == "italic":
+        return f"_{inner}_"
+    if kind == "strike":
+        return f"~{inner}~"
+    # bold and alt_bold (__)
+    return f"*{inner}*"
+
+
+def markdown_to_slack(content: str) -> str:
+    """Convert markdown to Slack-compatible mrkdwn format."""
+    if _MARKDOWN_CHARS.isdisjoint(content):
+        return content
+
+    # First convert headers to bold text
+    if "#" in content:
+        content = _HEADER_RE.sub(r"*\1*", content)
+
+    # Without backticks there is no code to protect, so format the whole text in one scan
+    if "`" not in content:
+        return _INLINE_RE.sub(_inline_to_slack, content)
+
+    # Split the input string into parts based on code blocks and inline code
+    parts = _CODE_SPLIT_RE.split(content)
+
+    # Apply the bold, italic, and strikethrough formatting to text not within code.
+    # Even parts are text, odd parts are the captured code spans; a text part starting
+    # with an unmatched backtick is left as-is.
+    parts[::2] = [part if part.startswith("`") else _INLINE_RE.sub(_inline_to_slack, part) for part in parts[::2]]
+    return "".join(parts)
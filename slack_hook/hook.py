@@ -5,6 +5,7 @@ from .assistant import (
     create_beast_mode_handler,
     create_normal_mode_handler,
     create_emergency_stop_handler,
+    create_history_invalidation_middleware,
 )
 from .conversation_manager import ConversationManager
 from .message_parser import parse_assistant_message
@@ -28,6 +29,9 @@ async def register_async(app, tool_registry):
     # Create assistant with dependencies
     assistant = create_assistant(tool_registry, conversation_manager, llm)
 
+    # Register history invalidation ahead of the assistant, which swallows message edits in its threads
+    app.middleware(create_history_invalidation_middleware(conversation_manager))
+
     # Register assistant
     app.assistant(assistant)
 
@@ -36,7 +40,8 @@ async def register_async(app, tool_registry):
     app.action("enable_normal_mode")(create_normal_mode_handler(conversation_manager))
     app.action("emergency_stop")(create_emergency_stop_handler(conversation_manager))
 
-    # Store conversation manager for cleanup on shutdown
+    # Store conversation manager and LLM client for cleanup on shutdown
     app._conversation_manager = conversation_manager
+    app._llm = llm
 
     return conversation_manager
@@ -1,11 +1,21 @@
 """Shared message parsing utilities for Slack assistant messages."""
 
-from typing import Any, List, Dict, Union, Optional
+import re
+from typing import Any, List, Dict, Tuple, Union, Optional
+
+# Every line is either quoted thinking, a "*Tool: name*" marker, or regular text; consecutive
+# thinking or text lines form one segment
+_SEGMENT_RE = re.compile(
+    r"(?P<thinking>(?:^>.*(?:\n|\Z))+)"
+    r"|(?P<tool>^\*Tool:.*\*.*(?:\n|\Z))"
+    r"|(?P<text>(?:^(?!>|\*Tool:.*\*).*(?:\n|\Z))+)",
+    re.MULTILINE,
+)
 
 
 def parse_assistant_message(
     text: str, attachments: Optional[List[Dict[str, Any]]] = None
-) -> Union[List[Dict[str, Union[str, Dict[str, str]]]], tuple]:
+) -> Union[List[Dict[str, Any]], Tuple[List[Dict[str, Any]], List[Dict[str, str]]]]:
     """Parse assistant message to recover thinking blocks and tool use blocks.
 
     Args:
@@ -22,12 +32,21 @@ def parse_assistant_message(
     if text.startswith(":warning:"):
         return []
 
-    content_blocks = []
-    tool_results = []  # Separate list for tool results
+    # Plain replies (no quoted thinking lines, no tool lines) are a single text block, whatever the attachments
+    if not text.startswith(">") and "\n>" not in text and "*Tool:" not in text:
+        text_content = text.strip()
+        return [{"type": "text", "text": text_content}] if text_content else []
+
+    # Blocks are bucketed by type as they are built, since thinking must come first, then text,
+    # then tool uses when thinking mode is enabled
+    thinking_blocks: List[Dict[str, Any]] = []
+    text_blocks: List[Dict[str, Any]] = []
+    tool_use_blocks: List[Dict[str, Any]] = []
+    tool_results: List[Dict[str, str]] = []  # Separate list for tool results
 
     # Extract metadata from attachments
-    thinking_signatures = []
-    tool_infos = []
+    thinking_signatures: List[str] = []
+    tool_infos: List[Dict[str, str]] = []
 
     if attachments:
         for attachment in attachments:
@@ -45,99 +64,51 @@ def parse_assistant_message(
                     tool_name = title[6:]  # Skip "Tool: "
                     tool_infos.append({"name": tool_name, "id": tool_id, "text": attachment.get("text", "")})
 
-    # Process text content
-    lines = text.split("\n")
-    current_block = []
-    in_thinking = False
-    thinking_index = 0
-    tool_index = 0
-
-    for line in lines:
-        # Check if this is quoted thinking content
-        if line.startswith(">"):
-            if not in_thinking:
-                # Start of thinking block - save any accumulated text first
-                if current_block:
-                    text_content = "\n".join(current_block).strip()
-                    if text_content:
-                        content_blocks.append({"type": "text", "text": text_content})
-                    current_block = []
-                in_thinking = True
-            # Remove the '> ' prefix
-            current_block.append(line[2:] if len(line) > 2 else "")
-        elif line.startswith("*Tool:") and "*" in line[6:]:
-            # Tool output line format: *Tool: tool_name*
-            if current_block:
-                # Save any accumulated content
-                if in_thinking:
-                    # Get signature from ordered list
-                    thinking_content = {
-                        "type": "thinking",
-                        "thinking": "\n".join(current_block),
-                    }
-                    if thinking_index < len(thinking_signatures):
-                        thinking_content["signature"] = thinking_signatures[thinking_index]
-                    content_blocks.append(thinking_content)
-                    thinking_index += 1
-                else:
-                    text_content = "\n".join(current_block).strip()
-                    if text_content:
-                        content_blocks.append({"type": "text", "text": text_content})
-                current_block = []
-                in_thinking = False
-
-            # Get tool info from ordered list
-            if tool_index < len(tool_infos):
-                tool_info = tool_infos[tool_index]
-                tool_index += 1
-                # Add tool use block
-                content_blocks.append(
-                    {
-                        "type": "tool_use",
-                        "id": tool_info["id"],
-                        "name": tool_info["name"],
-                        "input": {},  # We don't store the original input
-                    }
-                )
-                # Store tool result separately - it needs to be in a user message
-                if tool_info.get("text"):
-                    tool_results.append({"tool_use_id": tool_info["id"], "result": tool_info["text"]})
-        else:
-            # Regular text line
-            if in_thinking:
-                # End of thinking block
-                thinking_content = {
-                    "type": "thinking",
-                    "thinking": "\n".join(current_block),
-                }
-                if thinking_index < len(thinking_signatures):
-                    thinking_content["signature"] = thinking_signatures[thinking_index]
-                content_blocks.append(thinking_content)
-                thinking_index += 1
-                current_block = []
-                in_thinking = False
-            current_block.append(line)
-
-    # Save any remaining content
-    if current_block:
-        if in_thinking:
-            thinking_content = {
+    # Segment the text in one pass into runs of quoted (thinking) lines, "*Tool: name*" lines
+    # and runs of regular text lines
+    thinking_index: int = 0
+    tool_index: int = 0
+
+    for match in _SEGMENT_RE.finditer(text):
+        segment = match.group()
+        kind = match.lastgroup
+
+        if kind == "text":
+            text_content = segment.strip()
+            if text_content:
+                text_blocks.append({"type": "text", "text": text_content})
+
+        elif kind == "thinking":
+            # Remove the '> ' prefix from each quoted line
+            thinking_lines = segment.split("\n")
+            if segment.endswith("\n"):
+                thinking_lines.pop()
+            thinking_content: Dict[str, Any] = {
                 "type": "thinking",
-                "thinking": "\n".join(current_block),
+                "thinking": "\n".join(line[2:] for line in thinking_lines),
             }
+            # Get signature from ordered list
             if thinking_index < len(thinking_signatures):
                 thinking_content["signature"] = thinking_signatures[thinking_index]
-            content_blocks.append(thinking_content)
-        else:
-            text_content = "\n".join(current_block).strip()
-            if text_content:
-                content_blocks.append({"type": "text", "text": text_content})
+            thinking_blocks.append(thinking_content)
+            thinking_index += 1
 
-    # Reorganize content blocks to ensure thinking blocks come first
-    # This is required when thinking mode is enabled
-    thinking_blocks = [block for block in content_blocks if block["type"] == "thinking"]
-    text_blocks = [block for block in content_blocks if block["type"] == "text"]
-    tool_use_blocks = [block for block in content_blocks if block["type"] == "tool_use"]
+        # Tool output line format: *Tool: tool_name*; get tool info from ordered list
+        elif tool_index < len(tool_infos):
+            tool_info = tool_infos[tool_index]
+            tool_index += 1
+            # Add tool use block
+            tool_use_blocks.append(
+                {
+                    "type": "tool_use",
+                    "id": tool_info["id"],
+                    "name": tool_info["name"],
+                    "input": {},  # We don't store the original input
+                }
+            )
+            # Store tool result separately - it needs to be in a user message
+            if tool_info.get("text"):
+                tool_results.append({"tool_use_id": tool_info["id"], "result": tool_info["text"]})
 
     # Reconstruct with thinking blocks first, then text, then tool uses
     ordered_blocks = thinking_blocks + text_blocks + tool_use_blocks
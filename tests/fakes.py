@@ -0,0 +1,125 @@
+"""Fake Anthropic stream, Slack and tool registry objects for driving AsyncClaude in tests."""
+
+import asyncio
+import copy
+from types import SimpleNamespace
+
+from slack_sdk.errors import SlackApiError
+
+
+def text_block(*texts):
+    """Stream events for a text block, with one text event per chunk."""
+    return [
+        SimpleNamespace(type="content_block_start", content_block=SimpleNamespace(type="text")),
+        *(SimpleNamespace(type="text", text=text) for text in texts),
+        SimpleNamespace(type="content_block_stop", content_block=SimpleNamespace(type="text")),
+    ]
+
+
+def tool_use_block(tool_id, name, tool_input=None):
+    """Stream events for a tool_use block."""
+    return [
+        SimpleNamespace(type="content_block_start", content_block=SimpleNamespace(type="tool_use", id=tool_id, name=name)),
+        SimpleNamespace(type="content_block_stop", content_block=SimpleNamespace(type="tool_use", input=tool_input or {})),
+    ]
+
+
+class FakeStream:
+    """Async iterator over canned stream events."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for event in self.events:
+            await asyncio.sleep(0)
+            yield event
+
+    async def close(self):
+        pass
+
+
+class FakeStreamManager:
+    """Async context manager returned by messages.stream()."""
+
+    def __init__(self, events):
+        self.stream = FakeStream(events)
+
+    async def __aenter__(self):
+        return self.stream
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeMessages:
+    """Stands in for client.messages, answering each request with the next scripted round."""
+
+    def __init__(self, rounds):
+        self.rounds = list(rounds)
+        self.requests = []
+
+    def stream(self, **params):
+        # Snapshot the request, since async_message keeps appending to and editing the same messages list
+        self.requests.append(copy.deepcopy(params))
+        events = [event for block in self.rounds.pop(0) for event in block]
+        return FakeStreamManager(events)
+
+
+class FakeClient:
+    """Stands in for AsyncAnthropic."""
+
+    def __init__(self, rounds):
+        self.messages = FakeMessages(rounds)
+
+
+class FakeSlackClient:
+    """Records chat.update calls, failing the calls whose 1-based numbers are in fail_calls."""
+
+    def __init__(self, fail_calls=()):
+        self.fail_calls = set(fail_calls)
+        self.updates = []
+
+    async def chat_update(self, channel, ts, text):
+        self.updates.append({"channel": channel, "ts": ts, "text": text})
+        if len(self.updates) in self.fail_calls:
+            raise SlackApiError("chat.update failed", {"ok": False, "error": "ratelimited"})
+
+
+class FakeSay:
+    """Records everything posted to the Slack thread."""
+
+    def __init__(self, client=None):
+        self.posts = []
+        if client is not None:
+            self.client = client
+
+    async def __call__(self, text=None, **kwargs):
+        self.posts.append({"text": text, **kwargs})
+        return {"channel": "C1", "ts": str(len(self.posts))}
+
+
+async def set_status(status):
+    """Ignore status updates."""
+
+
+class FakeRegistry:
+    """Async tool registry whose tools return canned results after a per-call delay."""
+
+    def __init__(self, results=None, delays=None):
+        self.results = results or {}
+        self.delays = delays or {}
+        self.events = []  # ("start" | "end", tool name, command) in the order they happened
+
+    def get_tool_schemas(self):
+        return [{"type": "custom", "name": "linear", "description": "d", "input_schema": {"type": "object"}}]
+
+    async def async_execute_tool(self, tool_name, tool_input):
+        key = tool_input.get("command", tool_name)
+        self.events.append(("start", tool_name, key))
+        await asyncio.sleep(self.delays.get(key, 0))
+        self.events.append(("end", tool_name, key))
+        return self.results.get(key, f"result of {key}")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Tests for the Bash tool's persistent shell session."""
+
+import threading
+import time
+
+import pytest
+
+from tools.bash import Bash
+
+
+class TestBash:
+    """Test suite for the Bash tool, driving a real bash process."""
+
+    @pytest.fixture
+    def bash(self):
+        """Create a Bash tool with a short timeout and stop its shell afterwards."""
+        tool = Bash(timeout=1)
+        yield tool
+        tool._kill_process()
+
+    def test_cd_and_export_persist(self, bash, tmp_path):
+        """Test that the working directory and exported variables carry over between calls."""
+        assert bash.execute(command=f"cd {tmp_path} && export LEBOT_TEST=kept")["exit_code"] == 0
+
+        result = bash.execute(command='pwd; echo "$LEBOT_TEST"')
+
+        assert result["stdout"] == f"{tmp_path}\nkept"
+        assert bash.working_dir == str(tmp_path)
+
+    def test_exit_restarts_shell_in_last_cwd(self, bash, tmp_path):
+        """Test that `exit 3` reports 3 and the next call gets a new shell in the last directory."""
+        bash.execute(command=f"cd {tmp_path} && export LEBOT_TEST=gone")
+
+        result = bash.execute(command="exit 3")
+        assert result["exit_code"] == 3
+        assert result["error"] is None
+
+        result = bash.execute(command='pwd; echo "[$LEBOT_TEST]"')
+        assert result["stdout"] == f"{tmp_path}\n[]"
+        assert result["exit_code"] == 0
+
+    def test_timeout_then_recovers(self, bash):
+        """Test that a command running past the timeout is killed and the session keeps working."""
+        start = time.monotonic()
+        result = bash.execute(command="echo started; sleep 5")
+
+        assert time.monotonic() - start < 3
+        assert result["error"] == "Timeout"
+        assert result["exit_code"] == -1
+        assert "started" in result["stdout"]
+
+        result = bash.execute(command="echo ok")
+        assert result["stdout"] == "ok"
+        assert result["exit_code"] == 0
+
+    @pytest.mark.parametrize("command", ['echo "unterminated', "if true; then echo x", "echo 'half"])
+    def test_syntax_error_does_not_wedge_shell(self, bash, command):
+        """Test that an incomplete command fails on its own instead of swallowing the next one."""
+        result = bash.execute(command=command)
+
+        assert result["error"] is None
+        assert result["exit_code"] == 2
+        assert "syntax error" in result["stderr"] or "unexpected EOF" in result["stderr"]
+
+        result = bash.execute(command="echo ok")
+        assert result["stdout"] == "ok"
+        assert result["exit_code"] == 0
+
+    @pytest.mark.parametrize("command", ["exec 1>&-", "exec 2>&-", "exec >/dev/null; echo hidden"])
+    def test_closing_shell_output_returns(self, bash, command):
+        """Test that closing or redirecting the shell's own output restarts the shell instead of hanging."""
+        start = time.monotonic()
+        result = bash.execute(command=command)
+
+        assert time.monotonic() - start < 1
+        assert result["error"] == "Shell output closed"
+        assert result["exit_code"] == -1
+
+        result = bash.execute(command="echo ok")
+        assert result["stdout"] == "ok"
+        assert result["exit_code"] == 0
+
+    def test_shell_ended_with_background_job_reports_exit_code(self, bash):
+        """Test that a shell ending while a background job holds its pipes is not reported as a timeout."""
+        result = bash.execute(command="sleep 30 & set -e; false")
+
+        assert result["error"] is None
+        assert result["exit_code"] == 1
+
+    def test_large_output_is_capped(self, bash):
+        """Test that ~200KB of output is cut at the cap with a notice, keeping the exit code and a clean session."""
+        result = bash.execute(
+            command="head -c 200000 /dev/zero | tr '\\0' x; head -c 30000 /dev/zero | tr '\\0' e >&2; (exit 4)"
+        )
+
+        assert result["stdout"] == "x" * Bash.MAX_STDOUT_BYTES + "\n... (output truncated)"
+        assert result["stderr"] == "e" * Bash.MAX_STDERR_BYTES + "\n... (error output truncated)"
+        assert result["exit_code"] == 4
+
+        result = bash.execute(command="echo next")
+        assert result == {"stdout": "next", "stderr": "", "exit_code": 0, "error": None}
+
+    def test_sentinel_like_output_is_preserved(self, bash):
+        """Test that output resembling the session's own markers is returned untouched."""
+        command = "printf 'a\\n___PWD___\\n/nowhere\\n___EXIT_CODE___\\n9\\n'; echo done"
+
+        result = bash.execute(command=command)
+
+        assert result["stdout"] == "a\n___PWD___\n/nowhere\n___EXIT_CODE___\n9\ndone"
+        assert result["exit_code"] == 0
+        assert bash.working_dir != "/nowhere"
+
+    def test_close_interrupts_running_command(self):
+        """Test that close() ends a command that is still running instead of waiting for its timeout."""
+        bash = Bash(timeout=30)
+        results = []
+        runner = threading.Thread(target=lambda: results.append(bash.execute(command="sleep 20")))
+        runner.start()
+        time.sleep(0.3)
+
+        start = time.monotonic()
+        bash.close()
+        runner.join(timeout=5)
+
+        assert time.monotonic() - start < 3
+        assert not runner.is_alive()
+        assert results[0]["exit_code"] != 0
+        assert bash.process is None
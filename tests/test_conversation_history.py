@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Tests for incrementally fetching thread history across turns."""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from slack_hook.assistant import create_history_invalidation_middleware
+from slack_hook.conversation_manager import ConversationManager, ConversationState, ThreadContext
+from slack_hook.message_parser import parse_assistant_message
+
+THREAD_TS = "1700000000.000001"
+
+
+class FakeRepliesClient:
+    """Serves a thread through conversations_replies the way Slack does, two messages per page."""
+
+    PAGE_SIZE = 2
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.calls = []
+
+    async def conversations_replies(self, channel, ts, limit, oldest=None, cursor=None):
+        self.calls.append({"oldest": oldest, "cursor": cursor})
+        # Slack always includes the thread parent, even when it is older than "oldest"
+        matching = [m for m in self.messages if m["ts"] == ts or oldest is None or m["ts"] > oldest]
+        start = int(cursor or 0)
+        end = start + self.PAGE_SIZE
+        response = {"messages": matching[start:end]}
+        if end < len(matching):
+            response["response_metadata"] = {"next_cursor": str(end)}
+        return response
+
+
+def user_message(ts, text):
+    return {"ts": ts, "text": text, "user": "U1"}
+
+
+def bot_message(ts, text):
+    return {"ts": ts, "text": text, "bot_id": "B1"}
+
+
+def message_changed(message, previous_text):
+    """Build the Slack event body sent when a thread message is edited."""
+    event = {
+        "type": "message",
+        "subtype": "message_changed",
+        "channel": "C1",
+        "message": {**message, "thread_ts": THREAD_TS},
+        "previous_message": {**message, "thread_ts": THREAD_TS, "text": previous_text},
+    }
+    return {"event": event}
+
+
+def send_event(conv, body):
+    """Pass an event body through the history invalidation middleware for a manager tracking conv."""
+    manager = ConversationManager(parse_assistant_message)
+    manager.conversations[manager._get_key("C1", THREAD_TS)] = conv
+    passed_on = []
+
+    async def call_next():
+        passed_on.append(body)
+
+    asyncio.run(create_history_invalidation_middleware(manager)(body, call_next))
+    assert passed_on == [body]
+
+
+class TestConversationHistory:
+    """Test suite for ConversationManager._fetch_thread_messages with a conversation's history cache."""
+
+    @pytest.fixture
+    def client(self):
+        """Create a thread with a parent, a reply and an answer, spanning two pages."""
+        return FakeRepliesClient(
+            [
+                user_message(THREAD_TS, "first question"),
+                bot_message("1700000000.000002", "first answer"),
+                user_message("1700000000.000003", "follow-up"),
+            ]
+        )
+
+    @staticmethod
+    def fetch(client, conv):
+        """Fetch the thread for one turn of the conversation."""
+        manager = ConversationManager(parse_assistant_message)
+        thread_context = ThreadContext(
+            context=SimpleNamespace(channel_id="C1", thread_ts=THREAD_TS, user_id="U1"),
+            client=client,
+            say=None,
+            set_status=None,
+            logger=logging.getLogger(__name__),
+        )
+        return asyncio.run(manager._fetch_thread_messages(thread_context, conv))
+
+    def test_first_turn_fetches_every_page(self, client):
+        """Test that the first turn reads the whole thread, following the cursor to the last page."""
+        conv = ConversationState(channel_id="C1", thread_ts=THREAD_TS)
+
+        messages = self.fetch(client, conv)
+
+        assert client.calls == [{"oldest": None, "cursor": None}, {"oldest": None, "cursor": "2"}]
+        assert messages == [
+            {"role": "user", "content": "first question"},
+            {"role": "assistant", "content": [{"type": "text", "text": "first answer"}]},
+            {"role": "user", "content": "follow-up"},
+        ]
+        assert conv.history_ts == "1700000000.000003"
+
+    def test_later_turn_fetches_only_new_messages(self, client):
+        """Test that the next turn asks for messages after history_ts and appends them once."""
+        conv = ConversationState(channel_id="C1", thread_ts=THREAD_TS)
+        self.fetch(client, conv)
+        client.calls.clear()
+        client.messages += [
+            bot_message("1700000000.000004", "second answer"),
+            user_message("1700000000.000005", "one more"),
+            bot_message("1700000000.000006", "third answer"),
+            user_message("1700000000.000007", "last question"),
+        ]
+
+        messages = self.fetch(client, conv)
+
+        # Slack returns the parent again alongside the four new replies, so they span three pages
+        assert client.calls == [
+            {"oldest": "1700000000.000003", "cursor": None},
+            {"oldest": "1700000000.000003", "cursor": "2"},
+            {"oldest": "1700000000.000003", "cursor": "4"},
+        ]
+        assert [message["content"] for message in messages] == [
+            "first question",
+            [{"type": "text", "text": "first answer"}],
+            "follow-up",
+            [{"type": "text", "text": "second answer"}],
+            "one more",
+            [{"type": "text", "text": "third answer"}],
+            "last question",
+        ]
+        assert messages is conv.history
+        assert conv.history_ts == "1700000000.000007"
+
+    def test_turn_without_new_messages_keeps_history(self, client):
+        """Test that refetching with nothing new returns the same history without duplicating the parent."""
+        conv = ConversationState(channel_id="C1", thread_ts=THREAD_TS)
+        first = list(self.fetch(client, conv))
+
+        messages = self.fetch(client, conv)
+
+        assert messages == first
+        assert conv.history_ts == "1700000000.000003"
+
+    def test_edited_message_invalidates_history(self, client):
+        """Test that editing a message already in history makes the next turn refetch and reparse the thread."""
+        conv = ConversationState(channel_id="C1", thread_ts=THREAD_TS)
+        self.fetch(client, conv)
+        client.calls.clear()
+        client.messages[2] = user_message("1700000000.000003", "edited follow-up")
+
+        send_event(conv, message_changed(client.messages[2], "follow-up"))
+        messages = self.fetch(client, conv)
+
+        assert client.calls == [{"oldest": None, "cursor": None}, {"oldest": None, "cursor": "2"}]
+        assert [message["content"] for message in messages] == [
+            "first question",
+            [{"type": "text", "text": "first answer"}],
+            "edited follow-up",
+        ]
+        assert conv.history_ts == "1700000000.000003"
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            # Slack re-sends the parent with the same text when a reply is added
+            message_changed(user_message(THREAD_TS, "first question"), "first question"),
+            # The bot streams into posts newer than the history
+            message_changed(bot_message("1700000000.000004", "second answer"), "second"),
+        ],
+    )
+    def test_other_changes_keep_history(self, client, body):
+        """Test that reply bookkeeping on the parent and edits after history_ts leave the history cached."""
+        conv = ConversationState(channel_id="C1", thread_ts=THREAD_TS)
+        first = self.fetch(client, conv)
+
+        send_event(conv, body)
+
+        assert conv.history is first
+        assert conv.history_ts == "1700000000.000003"
@@ -7,10 +7,31 @@ from unittest.mock import Mock, patch
 from datetime import datetime, timedelta
 from tools.linear import Linear
 
+# Fixed clock for the mock payloads and the tool under test, so date windows don't shift between runs
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+NOW_ISO = NOW.isoformat() + "Z"
+TWO_DAYS_AGO_ISO = (NOW - timedelta(days=2)).isoformat() + "Z"
+FIVE_DAYS_AGO_ISO = (NOW - timedelta(days=5)).isoformat() + "Z"
+TEN_DAYS_AGO_ISO = (NOW - timedelta(days=10)).isoformat() + "Z"
+
+
+class FrozenDatetime(datetime):
+    """datetime whose now() always returns NOW."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return NOW
+
 
 class TestLinearTool:
     """Test suite for the Linear tool."""
 
+    @pytest.fixture(autouse=True)
+    def frozen_now(self):
+        """Make the Linear tool see NOW as the current time."""
+        with patch("tools.linear.datetime", FrozenDatetime):
+            yield
+
     @pytest.fixture
     def mock_linear_client(self):
         """Create a mock LinearClient."""
@@ -63,7 +84,6 @@ class TestLinearTool:
     def test_activity_tracker_with_days(self, linear_tool):
         """Test activity tracker with days parameter."""
         # Mock response with actual activity
-        now = datetime.now()
         linear_tool.client.query.return_value = {
             "issues": {
                 "nodes": [
@@ -73,13 +93,13 @@ class TestLinearTool:
                         "title": "Test Issue",
                         "state": {"name": "In Progress"},
                         "assignee": {"name": "John Doe", "email": "john@example.com"},
-                        "updatedAt": now.isoformat() + "Z",
-                        "createdAt": (now - timedelta(days=5)).isoformat() + "Z",
+                        "updatedAt": NOW_ISO,
+                        "createdAt": FIVE_DAYS_AGO_ISO,
                         "history": {
                             "nodes": [
                                 {
                                     "id": "h1",
-                                    "createdAt": (now - timedelta(days=2)).isoformat() + "Z",
+                                    "createdAt": TWO_DAYS_AGO_ISO,
                                     "fromState": {"name": "Todo"},
                                     "toState": {"name": "In Progress"},
                                 }
@@ -121,8 +141,8 @@ class TestLinearTool:
                         "title": "Test Issue",
                         "state": {"name": "In Progress", "type": "started"},
                         "assignee": {"id": "user1", "name": "John Doe", "email": "john@example.com"},
-                        "updatedAt": (datetime.now() - timedelta(days=5)).isoformat() + "Z",
-                        "createdAt": (datetime.now() - timedelta(days=10)).isoformat() + "Z",
+                        "updatedAt": FIVE_DAYS_AGO_ISO,
+                        "createdAt": TEN_DAYS_AGO_ISO,
                         "history": {"nodes": []},
                         "comments": {"nodes": []},
                     }
@@ -161,8 +181,8 @@ class TestLinearTool:
                             "progress": 0.5,
                             "targetDate": "2024-12-31",
                         },
-                        "updatedAt": datetime.now().isoformat() + "Z",
-                        "createdAt": datetime.now().isoformat() + "Z",
+                        "updatedAt": NOW_ISO,
+                        "createdAt": NOW_ISO,
                     }
                 ]
             }
@@ -195,10 +215,8 @@ class TestLinearTool:
                 "name": "Test Project",
                 "initiatives": {"nodes": [{"name": "Test Initiative", "description": "Test description"}]},
             },
-            "status_changes": [{"date": datetime.now(), "from": "Todo", "to": "In Progress"}],
-            "filtered_comments": [
-                {"createdAt": datetime.now().isoformat() + "Z", "user": {"name": "Jane Doe"}, "body": "Test comment"}
-            ],
+            "status_changes": [{"date": NOW, "from": "Todo", "to": "In Progress"}],
+            "filtered_comments": [{"createdAt": NOW_ISO, "user": {"name": "Jane Doe"}, "body": "Test comment"}],
         }
 
         formatted = linear_tool._format_issue_activity(issue)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Tests for markdown to Slack mrkdwn conversion."""
+
+import pytest
+
+from slack_hook.claude import AsyncClaude
+
+
+class TestMarkdownToSlack:
+    """Test suite for AsyncClaude.markdown_to_slack."""
+
+    @pytest.mark.parametrize(
+        "markdown, expected",
+        [
+            ("**bold**", "*bold*"),
+            ("*italic*", "_italic_"),
+            ("***both***", "_*both*_"),
+            ("__bold__", "*bold*"),
+            ("~~gone~~", "~gone~"),
+            ("**bold *italic* more**", "*bold _italic_ more*"),
+            ("Some **bold** and *italic* text", "Some *bold* and _italic_ text"),
+        ],
+    )
+    def test_inline_formatting(self, markdown, expected):
+        """Test that inline markdown is converted to mrkdwn."""
+        assert AsyncClaude.markdown_to_slack(markdown) == expected
+
+    def test_code_is_left_untouched(self):
+        """Test that inline code and fenced code blocks are not reformatted."""
+        markdown = "Use `**kwargs` here\n```\n**not bold** and ~~kept~~\n```\nthen **bold**"
+        expected = "Use `**kwargs` here\n```\n**not bold** and ~~kept~~\n```\nthen *bold*"
+        assert AsyncClaude.markdown_to_slack(markdown) == expected
+
+    def test_plain_text_and_slack_syntax_preserved(self):
+        """Test that plain text, list bullets and Slack mentions pass through unchanged."""
+        text = "Hi <@U123> see <#C456>\n* item one\n* item two\nsnake_case_name"
+        assert AsyncClaude.markdown_to_slack(text) == text
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Tests for rebuilding assistant content blocks from Slack posts."""
+
+from slack_hook.message_parser import parse_assistant_message
+
+
+class TestParseAssistantMessage:
+    """Test suite for parse_assistant_message."""
+
+    def test_thinking_and_text(self):
+        """Test that quoted lines become a signed thinking block ahead of the text."""
+        text = "> first line\n> second line\nThe answer is *42*"
+        attachments = [{"footer": "thinking:SIG"}]
+        assert parse_assistant_message(text, attachments) == [
+            {"type": "thinking", "thinking": "first line\nsecond line", "signature": "SIG"},
+            {"type": "text", "text": "The answer is *42*"},
+        ]
+
+    def test_tool_lines_pair_with_attachments(self):
+        """Test that each tool line is paired, in order, with the next tool attachment."""
+        text = "*Tool: bash*\n*Tool: linear*"
+        attachments = [
+            {"footer": "Tool ID: t1", "title": "Tool: bash", "text": "ok"},
+            {"footer": "Tool ID: t2", "title": "Tool: linear", "text": ""},
+        ]
+        content_blocks, tool_results = parse_assistant_message(text, attachments)
+        assert content_blocks == [
+            {"type": "tool_use", "id": "t1", "name": "bash", "input": {}},
+            {"type": "tool_use", "id": "t2", "name": "linear", "input": {}},
+        ]
+        assert tool_results == [{"tool_use_id": "t1", "result": "ok"}]
+
+    def test_blocks_are_reordered(self):
+        """Test that thinking comes first, then text, then tool uses."""
+        text = "Let me check\n> hmm\n*Tool: bash*\nDone"
+        attachments = [{"footer": "Tool ID: t1", "title": "Tool: bash", "text": ""}]
+        assert [block["type"] for block in parse_assistant_message(text, attachments)] == [
+            "thinking",
+            "text",
+            "text",
+            "tool_use",
+        ]
+
+    def test_plain_reply_is_one_text_block(self):
+        """Test that a reply without thinking or tool lines becomes a single stripped text block."""
+        text = "Ping <@U123> about it\n\nThanks!\n"
+        assert parse_assistant_message(text, [{"footer": "thinking:SIG"}]) == [
+            {"type": "text", "text": "Ping <@U123> about it\n\nThanks!"}
+        ]
+
+    def test_warning_messages_are_ignored(self):
+        """Test that system warnings are not replayed as assistant content."""
+        assert parse_assistant_message(":warning: Error: boom") == []
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Tests for the exact-match response cache."""
+
+import asyncio
+import time
+
+import pytest
+
+from slack_hook.claude import AsyncClaude
+from tests.fakes import FakeClient, FakeRegistry, FakeSay, set_status, text_block, tool_use_block
+
+
+def ask(llm, content, model="claude-sonnet-4-20250514", system="system", tool_registry=None):
+    """Send a one-message conversation and return what was posted to Slack."""
+    say = FakeSay()
+    asyncio.run(
+        llm.async_message(
+            set_status=set_status,
+            messages_in_thread=[{"role": "user", "content": content}],
+            say=say,
+            tool_registry=tool_registry,
+            system_content=system,
+            model=model,
+        )
+    )
+    return [post["text"] for post in say.posts]
+
+
+class TestResponseCache:
+    """Test suite for AsyncClaude's response cache."""
+
+    @pytest.fixture
+    def make_llm(self, monkeypatch):
+        """Create clients with the given RESPONSE_CACHE_TTL answering from scripted rounds."""
+
+        def make(rounds, ttl="60"):
+            monkeypatch.setenv("RESPONSE_CACHE_TTL", ttl)
+            llm = AsyncClaude(api_key="test")
+            llm.client = FakeClient(rounds)
+            return llm
+
+        return make
+
+    def test_identical_request_is_replayed(self, make_llm):
+        """Test that an identical request is answered from the cache with the same Slack output."""
+        llm = make_llm([[text_block("Hello **there**")]])
+
+        first = ask(llm, "hi")
+        second = ask(llm, "hi")
+
+        assert len(llm.client.messages.requests) == 1
+        assert first == second == ["Hello *there*"]
+
+    @pytest.mark.parametrize(
+        "changed",
+        [{"content": "bye"}, {"model": "claude-opus-4-20250514"}, {"system": "other system"}],
+    )
+    def test_different_request_misses(self, make_llm, changed):
+        """Test that a different model, system prompt or conversation is sent to the API."""
+        llm = make_llm([[text_block("one")], [text_block("two")]])
+        request = {"content": "hi", "model": "claude-sonnet-4-20250514", "system": "system"}
+
+        ask(llm, **request)
+        posted = ask(llm, **{**request, **changed})
+
+        assert len(llm.client.messages.requests) == 2
+        assert posted == ["two"]
+
+    def test_entry_expires_after_ttl(self, make_llm):
+        """Test that an entry is not used once RESPONSE_CACHE_TTL has passed."""
+        llm = make_llm([[text_block("one")], [text_block("two")]], ttl="0.05")
+
+        ask(llm, "hi")
+        time.sleep(0.1)
+        posted = ask(llm, "hi")
+
+        assert len(llm.client.messages.requests) == 2
+        assert posted == ["two"]
+
+    def test_oldest_entry_is_evicted_when_full(self, make_llm):
+        """Test that the oldest entry is dropped at RESPONSE_CACHE_SIZE while newer ones stay cached."""
+        llm = make_llm([[text_block(text)] for text in ("a", "b", "c", "a again")])
+        llm.RESPONSE_CACHE_SIZE = 2
+
+        for content in ("a", "b", "c"):
+            ask(llm, content)
+
+        assert ask(llm, "c") == ["c"]
+        assert ask(llm, "b") == ["b"]
+        assert len(llm.client.messages.requests) == 3
+        assert ask(llm, "a") == ["a again"]
+        assert len(llm.client.messages.requests) == 4
+
+    def test_zero_ttl_disables_cache(self, make_llm):
+        """Test that RESPONSE_CACHE_TTL=0 sends every request to the API and stores nothing."""
+        llm = make_llm([[text_block("one")], [text_block("two")]], ttl="0")
+
+        ask(llm, "hi")
+        posted = ask(llm, "hi")
+
+        assert len(llm.client.messages.requests) == 2
+        assert posted == ["two"]
+        assert llm._response_cache == {}
+
+    def test_tool_use_responses_are_not_cached(self, make_llm):
+        """Test that a response calling tools is neither stored nor replayed."""
+        llm = make_llm(
+            [
+                [tool_use_block("t1", "linear", {"command": "a"})],
+                [text_block("first answer")],
+                [tool_use_block("t2", "linear", {"command": "a"})],
+                [text_block("second answer")],
+            ]
+        )
+        registry = FakeRegistry()
+
+        ask(llm, "hi", tool_registry=registry)
+        posted = ask(llm, "hi", tool_registry=registry)
+
+        assert len(llm.client.messages.requests) == 4
+        assert "second answer" in posted
+        assert [event for event in registry.events if event[0] == "start"] == [("start", "linear", "a")] * 2
+        assert llm._response_cache == {}
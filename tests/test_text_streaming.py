@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Tests for streaming long text blocks into a Slack message with chat.update."""
+
+import asyncio
+
+import pytest
+
+from slack_hook.claude import AsyncClaude
+from tests.fakes import FakeClient, FakeSay, FakeSlackClient, set_status, text_block
+
+CHUNKS = ("Hello ", "**there**", " friend")
+FULL_TEXT = "Hello *there* friend"
+
+
+class TestTextStreaming:
+    """Test suite for AsyncClaude's streaming text updates."""
+
+    @pytest.fixture
+    def stream_text(self, monkeypatch):
+        """Stream one text block in chunks with the given update interval, returning the Slack posts and updates."""
+
+        def stream(interval, fail_calls=()):
+            monkeypatch.setattr(AsyncClaude, "TEXT_UPDATE_INTERVAL", interval)
+            llm = AsyncClaude(api_key="test")
+            llm.client = FakeClient([[text_block(*CHUNKS)]])
+            slack_client = FakeSlackClient(fail_calls)
+            say = FakeSay(client=slack_client)
+            asyncio.run(
+                llm.async_message(
+                    set_status=set_status,
+                    messages_in_thread=[{"role": "user", "content": "hi"}],
+                    say=say,
+                    tool_registry=None,
+                    system_content="system",
+                )
+            )
+            return [post["text"] for post in say.posts], slack_client.updates
+
+        return stream
+
+    def test_block_within_interval_is_posted_once(self, stream_text):
+        """Test that a block that finishes before TEXT_UPDATE_INTERVAL is posted whole without chat.update."""
+        posts, updates = stream_text(60)
+
+        assert posts == [FULL_TEXT]
+        assert updates == []
+
+    def test_long_block_streams_into_one_message(self, stream_text):
+        """Test that the first post goes out once the interval passes and later text edits that same message."""
+        posts, updates = stream_text(0)
+
+        assert posts == ["Hello "]
+        assert [update["ts"] for update in updates] == ["1"] * 3
+        assert [update["text"] for update in updates] == ["Hello *there*", FULL_TEXT, FULL_TEXT]
+
+    def test_failed_periodic_update_is_caught_up(self, stream_text):
+        """Test that a failed update while streaming is repaired by the final update."""
+        posts, updates = stream_text(0, fail_calls={1})
+
+        assert posts == ["Hello "]
+        assert updates[-1]["text"] == FULL_TEXT
+
+    def test_failed_final_update_posts_full_block(self, stream_text):
+        """Test that the whole block is posted when the final chat.update fails."""
+        posts, updates = stream_text(0, fail_calls={3})
+
+        assert len(updates) == 3
+        assert posts == ["Hello ", FULL_TEXT]
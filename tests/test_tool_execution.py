@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Tests for running tool calls while the response streams."""
+
+import asyncio
+
+import pytest
+
+from slack_hook.claude import AsyncClaude
+from tests.fakes import FakeClient, FakeRegistry, FakeSay, set_status, text_block, tool_use_block
+
+
+class TestToolExecution:
+    """Test suite for tool concurrency and ordering in AsyncClaude."""
+
+    @pytest.fixture
+    def run_turn(self):
+        """Run one turn whose first round calls the given tools, returning the client, registry and Slack posts."""
+
+        def run(tool_uses, delays):
+            llm = AsyncClaude(api_key="test")
+            llm.client = FakeClient([[tool_use_block(*tool_use) for tool_use in tool_uses], [text_block("done")]])
+            registry = FakeRegistry(delays=delays)
+            say = FakeSay()
+            asyncio.run(
+                llm.async_message(
+                    set_status=set_status,
+                    messages_in_thread=[{"role": "user", "content": "hi"}],
+                    say=say,
+                    tool_registry=registry,
+                    system_content="system",
+                )
+            )
+            return llm, registry, say
+
+        return run
+
+    def test_different_tools_overlap(self, run_turn):
+        """Test that calls to different tools in one turn run at the same time."""
+        _, registry, _ = run_turn(
+            [("t1", "bash", {"command": "a"}), ("t2", "linear", {"command": "b"})], delays={"a": 0.1, "b": 0.1}
+        )
+
+        assert registry.events[:2] == [("start", "bash", "a"), ("start", "linear", "b")]
+
+    def test_same_tool_calls_run_in_order(self, run_turn):
+        """Test that a second call to the same tool waits for the first, even if it would finish sooner."""
+        _, registry, _ = run_turn(
+            [("t1", "bash", {"command": "a"}), ("t2", "bash", {"command": "b"})], delays={"a": 0.1, "b": 0}
+        )
+
+        assert registry.events == [
+            ("start", "bash", "a"),
+            ("end", "bash", "a"),
+            ("start", "bash", "b"),
+            ("end", "bash", "b"),
+        ]
+
+    def test_results_keep_tool_use_order(self, run_turn):
+        """Test that results are returned in tool_use order when tools finish out of order."""
+        llm, registry, say = run_turn(
+            [("t1", "linear", {"command": "slow"}), ("t2", "bash", {"command": "fast"})], delays={"slow": 0.1, "fast": 0}
+        )
+
+        # The later call really did finish first
+        ends = [event[2] for event in registry.events if event[0] == "end"]
+        assert ends == ["fast", "slow"]
+
+        tool_results = llm.client.messages.requests[1]["messages"][-1]["content"]
+        assert [(block["tool_use_id"], block["content"]) for block in tool_results] == [
+            ("t1", "result of slow"),
+            ("t2", "result of fast"),
+        ]
+
+        tool_post = next(post for post in say.posts if post.get("attachments"))
+        assert [attachment["footer"] for attachment in tool_post["attachments"]] == ["Tool ID: t1", "Tool ID: t2"]
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Tests for compacting tool results and the moving conversation cache breakpoint."""
+
+import asyncio
+
+import pytest
+
+from slack_hook.claude import AsyncClaude
+from tests.fakes import FakeClient, FakeRegistry, FakeSay, set_status, text_block, tool_use_block
+
+
+def count_cache_control(value):
+    """Count cache_control markers anywhere in a request."""
+    if isinstance(value, dict):
+        return ("cache_control" in value) + sum(count_cache_control(item) for item in value.values())
+    if isinstance(value, list):
+        return sum(count_cache_control(item) for item in value)
+    return 0
+
+
+class TestToolResultCompaction:
+    """Test suite for AsyncClaude._compact_tool_results and the tool loop's cache breakpoint."""
+
+    @pytest.fixture
+    def llm(self):
+        """Create a client with the default tool result limits."""
+        return AsyncClaude(api_key="test")
+
+    @staticmethod
+    def tool_round(*tool_ids):
+        """Assistant content blocks for one round of linear calls."""
+        return [{"type": "tool_use", "id": tool_id, "name": "linear", "input": {}} for tool_id in tool_ids]
+
+    def test_repeated_large_result_becomes_reference(self, llm):
+        """Test that a repeated large result points back to the first copy, which is kept."""
+        large = "x" * llm.TOOL_RESULT_DEDUP_MIN_CHARS
+        tool_results = [
+            {"type": "tool_result", "tool_use_id": "t1", "content": large},
+            {"type": "tool_result", "tool_use_id": "t2", "content": large},
+        ]
+
+        llm._compact_tool_results(self.tool_round("t1", "t2"), tool_results, {})
+
+        assert tool_results[0]["content"] == large
+        assert tool_results[1]["content"] == "[Identical to the result of tool_use_id t1]"
+
+    def test_repeat_in_later_round_references_earlier_round(self, llm):
+        """Test that results are deduplicated across rounds of the same request."""
+        large = "y" * llm.TOOL_RESULT_DEDUP_MIN_CHARS
+        seen = {}
+        first = [{"type": "tool_result", "tool_use_id": "t1", "content": large}]
+        second = [{"type": "tool_result", "tool_use_id": "t2", "content": large}]
+
+        llm._compact_tool_results(self.tool_round("t1"), first, seen)
+        llm._compact_tool_results(self.tool_round("t2"), second, seen)
+
+        assert first[0]["content"] == large
+        assert second[0]["content"] == "[Identical to the result of tool_use_id t1]"
+
+    def test_small_results_are_left_alone(self, llm):
+        """Test that identical results below the dedup threshold are sent in full."""
+        small = "z" * (llm.TOOL_RESULT_DEDUP_MIN_CHARS - 1)
+        tool_results = [
+            {"type": "tool_result", "tool_use_id": "t1", "content": small},
+            {"type": "tool_result", "tool_use_id": "t2", "content": small},
+        ]
+
+        llm._compact_tool_results(self.tool_round("t1", "t2"), tool_results, {})
+
+        assert [block["content"] for block in tool_results] == [small, small]
+
+    def test_single_conversation_breakpoint_across_rounds(self, llm):
+        """Test that every request in a multi-round tool loop stays within the API's 4 cache_control blocks."""
+        large = "r" * llm.TOOL_RESULT_DEDUP_MIN_CHARS
+        llm.client = FakeClient(
+            [
+                [tool_use_block("t1", "linear", {"command": "a"})],
+                [tool_use_block("t2", "linear", {"command": "b"})],
+                [tool_use_block("t3", "linear", {"command": "c"})],
+                [text_block("done")],
+            ]
+        )
+        registry = FakeRegistry(results={"a": large, "b": large})
+
+        asyncio.run(
+            llm.async_message(
+                set_status=set_status,
+                messages_in_thread=[{"role": "user", "content": "hi"}],
+                say=FakeSay(),
+                tool_registry=registry,
+                system_content="system",
+            )
+        )
+
+        requests = llm.client.messages.requests
+        assert len(requests) == 4
+        for request in requests:
+            assert count_cache_control(request["messages"]) <= 1
+            assert count_cache_control(request) <= 4
+
+        # Each follow-up marks only its newest tool result
+        for request, tool_id in zip(requests[1:], ["t1", "t2", "t3"]):
+            tool_result = request["messages"][-1]["content"][-1]
+            assert tool_result["tool_use_id"] == tool_id
+            assert tool_result["cache_control"] == {"type": "ephemeral"}
+
+        # The repeat in round two was sent as a reference to round one
+        assert requests[2]["messages"][-1]["content"][0]["content"] == "[Identical to the result of tool_use_id t1]"
+        assert requests[2]["messages"][2]["content"][0]["content"] == large
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Tests for truncating long tool results and paging through them with fetch_tool_result."""
+
+import asyncio
+import hashlib
+
+import pytest
+
+from slack_hook.claude import AsyncClaude
+
+
+class RecordingRegistry:
+    """Tool registry that records which tools reached it."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def async_execute_tool(self, tool_name, tool_input):
+        self.calls.append((tool_name, tool_input))
+        return f"ran {tool_name}"
+
+
+class TestToolResultTruncation:
+    """Test suite for AsyncClaude's tool result store."""
+
+    @pytest.fixture
+    def llm(self, monkeypatch):
+        """Create a client that truncates tool results after 10 characters."""
+        monkeypatch.setenv("MAX_TOOL_RESULT_CHARS", "10")
+        return AsyncClaude(api_key="test")
+
+    def test_truncation_notice_and_ref(self, llm):
+        """Test that a long result is cut at the limit with a notice naming its ref and next offset."""
+        content = "0123456789" + "x" * 15
+        ref = hashlib.blake2b(content.encode(), digest_size=6).hexdigest()
+
+        truncated = llm._truncate_tool_result(content)
+
+        assert truncated == (
+            "0123456789\n...[truncated: 15 more characters; call fetch_tool_result with "
+            f'ref="{ref}" and offset=10 to read more]'
+        )
+        assert llm._tool_result_store[ref] == content
+
+    def test_short_result_is_unchanged(self, llm):
+        """Test that results within the limit are returned as-is and not stored."""
+        assert llm._truncate_tool_result("short") == "short"
+        assert llm._tool_result_store == {}
+
+    def test_paging_with_offset(self, llm):
+        """Test that fetch_tool_result chunks continue from the offset until the end of the result."""
+        content = "a" * 10 + "b" * 10 + "c" * 5
+        llm._truncate_tool_result(content)
+        ref = next(iter(llm._tool_result_store))
+
+        assert llm._read_tool_result(ref, 10) == "b" * 10 + llm._truncation_notice(ref, 20, 25)
+        assert llm._read_tool_result(ref, 20) == "c" * 5
+        assert llm._read_tool_result(ref, 25) == ""
+
+    def test_unknown_ref_returns_error(self, llm):
+        """Test that an unknown ref produces an error string instead of raising."""
+        result = llm._read_tool_result("missing", 0)
+
+        assert result.startswith("Error:")
+        assert "missing" in result
+
+    def test_store_evicts_oldest_when_full(self, llm):
+        """Test that the oldest stored result is dropped once the store is full."""
+        llm.TOOL_RESULT_STORE_SIZE = 2
+        for letter in "abc":
+            llm._truncate_tool_result(letter * 20)
+        refs = [hashlib.blake2b((letter * 20).encode(), digest_size=6).hexdigest() for letter in "abc"]
+
+        assert list(llm._tool_result_store) == refs[1:]
+        assert llm._read_tool_result(refs[0]).startswith("Error:")
+        assert llm._read_tool_result(refs[2]) == "c" * 10 + llm._truncation_notice(refs[2], 10, 20)
+
+    def test_fetch_tool_result_is_answered_locally(self, llm):
+        """Test that fetch_tool_result never reaches the registry while other tools still do."""
+        registry = RecordingRegistry()
+        run_tool = llm._tool_runner(registry)
+        llm._truncate_tool_result("z" * 20)
+        ref = next(iter(llm._tool_result_store))
+
+        fetched = asyncio.run(run_tool("fetch_tool_result", {"ref": ref, "offset": 10}))
+        ran = asyncio.run(run_tool("bash", {"command": "ls"}))
+
+        assert fetched == "z" * 10
+        assert ran == "ran bash"
+        assert registry.calls == [("bash", {"command": "ls"})]
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Tests for the cache-controlled tool list sent with each request."""
+
+import asyncio
+
+from slack_hook.claude import AsyncClaude
+from tests.fakes import FakeClient, FakeRegistry, FakeSay, set_status, text_block
+
+EXTRA_TOOL = {"name": "another", "description": "d", "input_schema": {"type": "object"}}
+
+
+def send(llm, tool_registry, tools=None):
+    """Send one request and return the tools it carried."""
+    asyncio.run(
+        llm.async_message(
+            set_status=set_status,
+            messages_in_thread=[{"role": "user", "content": "hi"}],
+            say=FakeSay(),
+            tool_registry=tool_registry,
+            system_content="system",
+            tools=tools,
+        )
+    )
+    return llm.client.messages.requests[-1]["tools"]
+
+
+class TestToolSchemas:
+    """Test suite for AsyncClaude's per-registry tool list."""
+
+    def test_registry_tools_are_built_once(self):
+        """Test that requests with the same registry reuse one sorted list with a single breakpoint on the last tool."""
+        llm = AsyncClaude(api_key="test")
+        llm.client = FakeClient([[text_block("one")], [text_block("two")]])
+        registry = FakeRegistry()
+        calls = []
+        get_tool_schemas = registry.get_tool_schemas
+        registry.get_tool_schemas = lambda: calls.append(1) or get_tool_schemas()
+
+        first = send(llm, registry)
+        second = send(llm, registry)
+
+        assert len(calls) == 1
+        assert [tool["name"] for tool in first] == ["fetch_tool_result", "linear"]
+        assert [tool.get("cache_control") for tool in first] == [None, {"type": "ephemeral"}]
+        assert second == first
+
+    def test_extra_tools_are_not_memoized(self):
+        """Test that tools passed with a request are included without replacing the registry's cached list."""
+        llm = AsyncClaude(api_key="test")
+        llm.client = FakeClient([[text_block("one")], [text_block("two")]])
+        registry = FakeRegistry()
+
+        with_extra = send(llm, registry, tools=[EXTRA_TOOL])
+        without = send(llm, registry)
+
+        assert [tool["name"] for tool in with_extra] == ["another", "fetch_tool_result", "linear"]
+        assert [tool["name"] for tool in without] == ["fetch_tool_result", "linear"]
@@ -1,6 +1,7 @@
 import logging
 import asyncio
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
 
 from .graphql import GraphQLClient, LinearClient
 from .bash import Bash
@@ -8,6 +9,60 @@ from .slack import Slack
 from .linear import Linear
 
 
+def _format_channel_list(result: Dict[str, Any]) -> str:
+    """Summarize the first 20 channels of a list_channels result."""
+    channels = result.get("channels", [])
+    lines = [f"Found {result.get('count', 0)} channels:\n\n"]
+    for ch in channels[:20]:  # Limit to 20 for readability
+        lines.append(f"• **{ch['name']}** (ID: {ch['id']})\n")
+        if ch.get("topic"):
+            lines.append(f"  Topic: {ch['topic']}\n")
+    if len(channels) > 20:
+        lines.append(f"\n... and {len(channels) - 20} more")
+    return "".join(lines)
+
+
+def _format_sent_message(result: Dict[str, Any]) -> str:
+    """Confirm where a message was sent."""
+    return f"Message sent successfully to {result.get('channel', 'unknown')} (ts: {result.get('ts', '')})"
+
+
+def _format_user(result: Dict[str, Any]) -> str:
+    """Format a lookup_user / get_user_info result."""
+    return (
+        f"**User:** {result.get('real_name', 'Unknown')} (@{result.get('name', '')})\n"
+        f"**Email:** {result.get('email', 'N/A')}\n"
+        f"**ID:** {result.get('id', 'N/A')}"
+    )
+
+
+def _format_channel_info(result: Dict[str, Any]) -> str:
+    """Format a get_channel_info result."""
+    return (
+        f"**Channel:** {result.get('name', 'Unknown')} (ID: {result.get('id', '')})\n"
+        f"**Private:** {result.get('is_private', False)}\n"
+        f"**Members:** {result.get('num_members', 0)}\n"
+        f"**Topic:** {result.get('topic', 'None')}"
+    )
+
+
+# Slack operation -> formatter for its result; other operations fall back to str()
+_SLACK_FORMATTERS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "list_channels": _format_channel_list,
+    "send_message": _format_sent_message,
+    "lookup_user": _format_user,
+    "get_user_info": _format_user,
+    "get_channel_info": _format_channel_info,
+}
+
+
+def _format_slack_result(operation: Optional[str], result: Dict[str, Any]) -> str:
+    """Format the result of a Slack operation for the LLM."""
+    if "error" in result:
+        return f"**Error:** {result['error']}"
+    return _SLACK_FORMATTERS.get(operation, str)(result)
+
+
 class ToolRegistry:
     """Registry for managing and executing tools requested by the LLM."""
 
@@ -20,6 +75,15 @@ class ToolRegistry:
         self.logger = logging.getLogger(__name__)
         self.tools = {}
         self.slack_client = slack_client
+        # Sync tools run here so they don't compete with the loop's default executor (e.g. DNS lookups)
+        self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="tool")
+        self._tool_schemas: Optional[List[Dict[str, Any]]] = None
+        # Tool name -> sync handler taking the tool input and returning the formatted output
+        self._tool_handlers: Dict[str, Callable[[Dict[str, Any]], str]] = {
+            "bash": self._execute_bash,
+            "slack": self._execute_slack,
+            "linear": self._execute_linear,
+        }
         self._initialize_tools()
 
     def _initialize_tools(self):
@@ -41,6 +105,13 @@ class ToolRegistry:
         except Exception as e:
             self.logger.warning(f"Failed to initialize Linear tool: {e}")
 
+    def close(self):
+        """Shut down the tool thread pool and the bash session."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        bash = self.tools.get("bash")
+        if bash is not None:
+            bash.close()
+
     def execute_tool(self, tool_name: str, tool_input: Dict[str, Any]) -> str:
         """Execute a tool with the given input.
 
@@ -56,112 +127,81 @@ class ToolRegistry:
             self.logger.error(error_msg)
             return f"Error: {error_msg}"
 
-        try:
-            if tool_name == "bash":
-                # Extract bash tool parameters
-                command = tool_input.get("command", "")
-                restart = tool_input.get("restart", False)
-
-                if not command and not restart:
-                    return "Error: No command provided"
-
-                # Execute the bash command
-                result = self.tools["bash"].execute(command=command, restart=restart)
-
-                # Format the output
-                output_parts = []
-
-                if result.get("stdout"):
-                    output_parts.append(f"```\n{result['stdout']}\n```")
-
-                if result.get("stderr"):
-                    output_parts.append(f"**Error output:**\n```\n{result['stderr']}\n```")
-
-                if result.get("error"):
-                    output_parts.append(f"**Execution error:** {result['error']}")
+        handler = self._tool_handlers.get(tool_name)
+        if handler is None:
+            return f"Tool {tool_name} not implemented"
 
-                if result.get("exit_code", 0) != 0:
-                    output_parts.append(f"**Exit code:** {result['exit_code']}")
+        try:
+            return handler(tool_input)
+        except Exception as e:
+            error_msg = f"Failed to execute tool {tool_name}: {e}"
+            self.logger.exception(error_msg)
+            return f"Error: {error_msg}"
 
-                return "\n\n".join(output_parts) if output_parts else "Command executed successfully (no output)"
+    def _execute_bash(self, tool_input: Dict[str, Any]) -> str:
+        """Run a bash command and format its output."""
+        # Extract bash tool parameters
+        command = tool_input.get("command", "")
+        restart = tool_input.get("restart", False)
 
-            elif tool_name == "slack":
-                # Extract slack tool parameters
-                operation = tool_input.get("operation")
-                params = tool_input.get("params", {})
+        if not command and not restart:
+            return "Error: No command provided"
 
-                if not operation:
-                    return "Error: No operation specified"
+        # Execute the bash command
+        result = self.tools["bash"].execute(command=command, restart=restart)
 
-                # Execute the slack operation
-                result = self.tools["slack"].execute(operation=operation, params=params)
+        # Format the output
+        output_parts = []
 
-                # Format the output
-                if "error" in result:
-                    return f"**Error:** {result['error']}"
+        if result.get("stdout"):
+            output_parts.append(f"```\n{result['stdout']}\n```")
 
-                # Format based on operation type
-                if operation == "list_channels":
-                    channels = result.get("channels", [])
-                    output = f"Found {result.get('count', 0)} channels:\n\n"
-                    for ch in channels[:20]:  # Limit to 20 for readability
-                        output += f"• **{ch['name']}** (ID: {ch['id']})\n"
-                        if ch.get("topic"):
-                            output += f"  Topic: {ch['topic']}\n"
-                    if len(channels) > 20:
-                        output += f"\n... and {len(channels) - 20} more"
-                    return output
+        if result.get("stderr"):
+            output_parts.append(f"**Error output:**\n```\n{result['stderr']}\n```")
 
-                elif operation == "send_message":
-                    return f"Message sent successfully to {result.get('channel', 'unknown')} (ts: {result.get('ts', '')})"
+        if result.get("error"):
+            output_parts.append(f"**Execution error:** {result['error']}")
 
-                elif operation in ["lookup_user", "get_user_info"]:
-                    return (
-                        f"**User:** {result.get('real_name', 'Unknown')} (@{result.get('name', '')})\n"
-                        f"**Email:** {result.get('email', 'N/A')}\n"
-                        f"**ID:** {result.get('id', 'N/A')}"
-                    )
+        if result.get("exit_code", 0) != 0:
+            output_parts.append(f"**Exit code:** {result['exit_code']}")
 
-                elif operation == "get_channel_info":
-                    return (
-                        f"**Channel:** {result.get('name', 'Unknown')} (ID: {result.get('id', '')})\n"
-                        f"**Private:** {result.get('is_private', False)}\n"
-                        f"**Members:** {result.get('num_members', 0)}\n"
-                        f"**Topic:** {result.get('topic', 'None')}"
-                    )
+        return "\n\n".join(output_parts) if output_parts else "Command executed successfully (no output)"
 
-                # Default formatting
-                return str(result)
+    def _execute_slack(self, tool_input: Dict[str, Any]) -> str:
+        """Run a Slack operation and format its result."""
+        # Extract slack tool parameters
+        operation = tool_input.get("operation")
+        params = tool_input.get("params", {})
 
-            elif tool_name == "linear":
-                # Extract linear tool parameters
-                operation = tool_input.get("operation")
-                params = tool_input.get("params", {})
+        if not operation:
+            return "Error: No operation specified"
 
-                if not operation:
-                    return "Error: No operation specified"
+        # Execute the slack operation
+        result = self.tools["slack"].execute(operation=operation, params=params)
+        return _format_slack_result(operation, result)
 
-                # Execute the linear operation
-                result = self.tools["linear"].execute(operation=operation, params=params)
+    def _execute_linear(self, tool_input: Dict[str, Any]) -> str:
+        """Run a Linear operation and return its report."""
+        # Extract linear tool parameters
+        operation = tool_input.get("operation")
+        params = tool_input.get("params", {})
 
-                # Format the output
-                if "error" in result:
-                    return f"**Error:** {result['error']}"
+        if not operation:
+            return "Error: No operation specified"
 
-                # Return the formatted report
-                if "report" in result:
-                    return result["report"]
+        # Execute the linear operation
+        result = self.tools["linear"].execute(operation=operation, params=params)
 
-                # Default formatting for unexpected responses
-                return str(result)
+        # Format the output
+        if "error" in result:
+            return f"**Error:** {result['error']}"
 
-            # Default case for other tools
-            return f"Tool {tool_name} not implemented"
+        # Return the formatted report
+        if "report" in result:
+            return result["report"]
 
-        except Exception as e:
-            error_msg = f"Failed to execute tool {tool_name}: {e}"
-            self.logger.exception(error_msg)
-            return f"Error: {error_msg}"
+        # Default formatting for unexpected responses
+        return str(result)
 
     async def async_execute_tool(self, tool_name: str, tool_input: Dict[str, Any]) -> str:
         """Execute a tool asynchronously with the given input.
@@ -194,50 +234,14 @@ class ToolRegistry:
                     # For other tools with async_execute
                     result = await tool.async_execute(**tool_input)
             else:
-                # Fall back to sync execution in thread pool
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(None, self.execute_tool, tool_name, tool_input)
+                # Fall back to sync execution in the tool thread pool
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self._executor, self.execute_tool, tool_name, tool_input)
                 return result
 
             # Handle tool-specific formatting (same as execute_tool)
             if tool_name == "slack":
-                # Format the output
-                if "error" in result:
-                    return f"**Error:** {result['error']}"
-
-                # Format based on operation type
-                operation = tool_input.get("operation")
-                if operation == "list_channels":
-                    channels = result.get("channels", [])
-                    output = f"Found {result.get('count', 0)} channels:\n\n"
-                    for ch in channels[:20]:  # Limit to 20 for readability
-                        output += f"• **{ch['name']}** (ID: {ch['id']})\n"
-                        if ch.get("topic"):
-                            output += f"  Topic: {ch['topic']}\n"
-                    if len(channels) > 20:
-                        output += f"\n... and {len(channels) - 20} more"
-                    return output
-
-                elif operation == "send_message":
-                    return f"Message sent successfully to {result.get('channel', 'unknown')} (ts: {result.get('ts', '')})"
-
-                elif operation in ["lookup_user", "get_user_info"]:
-                    return (
-                        f"**User:** {result.get('real_name', 'Unknown')} (@{result.get('name', '')})\n"
-                        f"**Email:** {result.get('email', 'N/A')}\n"
-                        f"**ID:** {result.get('id', 'N/A')}"
-                    )
-
-                elif operation == "get_channel_info":
-                    return (
-                        f"**Channel:** {result.get('name', 'Unknown')} (ID: {result.get('id', '')})\n"
-                        f"**Private:** {result.get('is_private', False)}\n"
-                        f"**Members:** {result.get('num_members', 0)}\n"
-                        f"**Topic:** {result.get('topic', 'None')}"
-                    )
-
-                # Default formatting
-                return str(result)
+                return _format_slack_result(tool_input.get("operation"), result)
 
             # For other async tools, return formatted result
             return str(result)
@@ -268,11 +272,12 @@ class ToolRegistry:
         Returns:
             List of tool schemas in Anthropic's format
         """
-        schemas = []
-        for tool_name, tool_instance in self.tools.items():
-            if hasattr(tool_instance, "get_schema"):
-                schemas.append(tool_instance.get_schema())
-        return schemas
+        # Tools are only registered in _initialize_tools, so the schemas are built once
+        if self._tool_schemas is None:
+            self._tool_schemas = [
+                tool_instance.get_schema() for tool_instance in self.tools.values() if hasattr(tool_instance, "get_schema")
+            ]
+        return list(self._tool_schemas)
 
 
 __all__ = ["GraphQLClient", "LinearClient", "Bash", "Slack", "Linear", "ToolRegistry"]
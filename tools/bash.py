@@ -1,16 +1,39 @@
 import logging
+import re
+import selectors
 import subprocess
 import os
-import tempfile
 import signal
+import threading
 import time
-from typing import Dict, Any
+import uuid
+from typing import Dict, Any, Optional, Tuple
 from .base import Tool
 
+# Printed on its own line after each command, ahead of the new working directory and exit code
+_PWD_SENTINEL = b"\n___PWD___\n"
+
+# Basic security checks - can be extended; one case-insensitive pass over the command
+_DANGEROUS_RE = re.compile(
+    r"rm\s+-rf\s+/"
+    r"|dd\s+if=/dev/zero"
+    r"|:\(\)\s*\{\s*:\|:&\s*\};:"  # Fork bomb
+    r"|mkfs\."
+    r"|format\s",
+    re.IGNORECASE,
+)
+
 
 class Bash(Tool):
     """Bash tool implementation for executing shell commands with persistent session."""
 
+    MAX_STDOUT_BYTES = 50000  # 50KB limit
+    MAX_STDERR_BYTES = 10000  # 10KB limit for errors
+    # Bytes kept from the end of oversized output so the sentinels that follow it are still seen
+    TAIL_BYTES = 8192
+    # How often a command that prints nothing is checked for having ended the shell
+    POLL_INTERVAL = 0.1
+
     def __init__(self, timeout: int = 30):
         """Initialize the bash tool with optional timeout.
 
@@ -19,9 +42,13 @@ class Bash(Tool):
         """
         self.timeout = timeout
         self.logger = logging.getLogger(__name__)
-        self.session_env = os.environ.copy()
+        self.session_env: Optional[Dict[str, str]] = None  # None inherits the process environment
         self.working_dir = os.getcwd()
         self.session_active = True
+        # One long-lived shell serves every command; the tool thread pool may call execute concurrently
+        self._lock = threading.Lock()
+        self.process = None
+        self._start_process()
 
     def get_schema(self) -> Dict[str, Any]:
         """Return the bash tool schema for Anthropic's API."""
@@ -62,102 +89,242 @@ class Bash(Tool):
                 "error": "Security block",
             }
 
+        with self._lock:
+            try:
+                return self._run(command)
+            except Exception as e:
+                self.logger.exception(f"Failed to execute command: {e}")
+                return {"stdout": "", "stderr": str(e), "exit_code": -1, "error": f"Execution failed: {e}"}
+
+    def _run(self, command: str) -> Dict[str, Any]:
+        """Run a command in the shell process and collect its output (caller holds the lock)."""
+        if self.process is None or self.process.poll() is not None:
+            self._start_process()
+
+        # The command is read into a variable through a quoted heredoc and eval'd, so a syntax error in it
+        # cannot leave the shell waiting for more input; stdin is closed so it cannot swallow the sentinels
+        tag = uuid.uuid4().hex
+        end_marker = f"___END_{tag}___"
+        script = (
+            f"IFS= read -r -d '' __lebot_cmd <<'___CMD_{tag}___'\n{command}\n___CMD_{tag}___\n"
+            'eval "$__lebot_cmd" </dev/null\n'
+            "__lebot_rc=$?\n"
+            "printf '\\n___PWD___\\n'; pwd\n"
+            "echo '___EXIT_CODE___'; echo $__lebot_rc\n"
+            f"echo '{end_marker}'; echo '{end_marker}' >&2\n"
+        )
+
+        deadline = time.monotonic() + self.timeout
         try:
-            # Create a temporary script file to preserve session state
-            with tempfile.NamedTemporaryFile(mode="w", suffix=".sh", delete=False) as script_file:
-                # Write session preservation logic
-                script_file.write("#!/bin/bash\n")
-                script_file.write(f"cd '{self.working_dir}'\n")
-                script_file.write(f"{command}\n")
-                script_file.write("LAST_EXIT_CODE=$?\n")  # Capture exit code immediately
-                script_file.write("echo '___PWD___'\n")
-                script_file.write("pwd\n")
-                script_file.write("echo '___EXIT_CODE___'\n")
-                script_file.write("echo $LAST_EXIT_CODE\n")
-                script_file.flush()
-
-                # Execute the command
-                process = subprocess.Popen(
-                    ["bash", script_file.name],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    env=self.session_env,
-                    text=True,
-                    preexec_fn=os.setsid,  # Create new process group for timeout handling
-                )
+            self.process.stdin.write(script.encode())
+            self.process.stdin.flush()
+            stdout, stderr, closed, finished = self._read_until(end_marker.encode(), deadline)
+        except subprocess.TimeoutExpired as e:
+            self._kill_process()
+            return {
+                "stdout": e.output,
+                "stderr": f"Command timed out after {self.timeout} seconds\n{e.stderr}",
+                "exit_code": -1,
+                "error": "Timeout",
+            }
+        except BrokenPipeError:
+            # The shell went away between commands; start a fresh one next time
+            self._kill_process()
+            raise
 
+        exit_code = 0
+        if closed:
+            exit_code = None
+            if not finished:
+                # Most likely the command ended the shell itself (e.g. `exit`, `set -e`)
                 try:
-                    stdout, stderr = process.communicate(timeout=self.timeout)
-                    exit_code = process.returncode
+                    exit_code = self.process.wait(timeout=max(0.0, deadline - time.monotonic()))
                 except subprocess.TimeoutExpired:
-                    # Kill the process group
-                    os.killpg(os.getpgid(process.pid), signal.SIGTERM)
-                    time.sleep(0.5)  # Give it time to terminate
-                    if process.poll() is None:
-                        os.killpg(os.getpgid(process.pid), signal.SIGKILL)
-                    stdout, stderr = process.communicate()
-                    return {
-                        "stdout": stdout,
-                        "stderr": f"Command timed out after {self.timeout} seconds\n{stderr}",
-                        "exit_code": -1,
-                        "error": "Timeout",
-                    }
-                finally:
-                    # Clean up temporary file
-                    try:
-                        os.unlink(script_file.name)
-                    except:
-                        pass
-
-                # Parse the output to extract PWD and actual exit code
-                stdout_lines = stdout.split("\n")
-                actual_stdout = []
-                new_pwd = None
-                actual_exit_code = exit_code
-
-                i = 0
-                while i < len(stdout_lines):
-                    if stdout_lines[i] == "___PWD___" and i + 1 < len(stdout_lines):
-                        new_pwd = stdout_lines[i + 1]
-                        i += 2
-                    elif stdout_lines[i] == "___EXIT_CODE___" and i + 1 < len(stdout_lines):
-                        try:
-                            actual_exit_code = int(stdout_lines[i + 1])
-                        except ValueError:
-                            pass
-                        i += 2
-                    else:
-                        actual_stdout.append(stdout_lines[i])
-                        i += 1
-
-                # Update working directory if changed
-                if new_pwd and os.path.exists(new_pwd):
-                    self.working_dir = new_pwd
-
-                # Truncate output if too large (similar to Claude's behavior)
-                final_stdout = "\n".join(actual_stdout).rstrip()
-                if len(final_stdout) > 50000:  # 50KB limit
-                    final_stdout = final_stdout[:50000] + "\n... (output truncated)"
-
-                if len(stderr) > 10000:  # 10KB limit for errors
-                    stderr = stderr[:10000] + "\n... (error output truncated)"
-
-                # Log the command execution
-                self.logger.info(f"Executed command: {command[:100]}{'...' if len(command) > 100 else ''}")
-
-                return {"stdout": final_stdout, "stderr": stderr, "exit_code": actual_exit_code, "error": None}
-
-        except Exception as e:
-            self.logger.exception(f"Failed to execute command: {e}")
-            return {"stdout": "", "stderr": str(e), "exit_code": -1, "error": f"Execution failed: {e}"}
+                    pass
+            # Either way this shell is done: a new one is started on the next call, and anything it left running
+            # in its process group goes with it
+            self._kill_process()
+
+        # The sentinels are always the tail of stdout, so split them off from the end instead of scanning every line;
+        # they are missing only when the command ended the shell or closed its stdout
+        actual_exit_code = exit_code
+        head, found, tail = stdout.rpartition(_PWD_SENTINEL.decode())
+        if found:
+            stdout = head
+            new_pwd, _, exit_tail = tail.partition("\n___EXIT_CODE___\n")
+            try:
+                actual_exit_code = int(exit_tail.strip())
+            except ValueError:
+                pass
+
+            # Update working directory if changed
+            if new_pwd and os.path.exists(new_pwd):
+                self.working_dir = new_pwd
+
+        final_stdout = stdout.rstrip()
+
+        if closed and exit_code is None:
+            # The command closed or redirected the shell's own stdout/stderr (e.g. `exec 1>&-`), so the shell was
+            # still running but could no longer report back
+            return {
+                "stdout": final_stdout,
+                "stderr": f"The shell's output was closed; the session has been restarted\n{stderr}",
+                "exit_code": -1,
+                "error": "Shell output closed",
+            }
+
+        # Log the command execution
+        self.logger.info(f"Executed command: {command[:100]}{'...' if len(command) > 100 else ''}")
+
+        return {"stdout": final_stdout, "stderr": stderr, "exit_code": actual_exit_code, "error": None}
+
+    def _read_until(self, marker: bytes, deadline: float) -> Tuple[str, str, bool, bool]:
+        """Read stdout and stderr until each has printed the marker line.
+
+        Args:
+            marker: Sentinel the shell echoes to both streams once the command has finished
+            deadline: time.monotonic() value after which the command is considered timed out
+
+        Output past MAX_STDOUT_BYTES / MAX_STDERR_BYTES is dropped as it arrives (similar to Claude's behavior),
+        while the streams keep being drained so the command can finish.
+
+        Returns:
+            Tuple of (stdout, stderr, closed, finished) with the markers removed; closed is True if a stream
+            hit EOF or the shell exited before both markers arrived, finished is True if either marker arrived
+
+        Raises:
+            subprocess.TimeoutExpired: If the deadline passes first, carrying the output read so far
+        """
+        line = marker + b"\n"
+        buffers = {self.process.stdout: bytearray(), self.process.stderr: bytearray()}
+        limits = {self.process.stdout: self.MAX_STDOUT_BYTES, self.process.stderr: self.MAX_STDERR_BYTES}
+        truncated = set()
+        closed = False
+        finished = False
+
+        with selectors.DefaultSelector() as selector:
+            for stream in buffers:
+                selector.register(stream, selectors.EVENT_READ)
+
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    stdout, stderr = self._decode_output(buffers, truncated)
+                    raise subprocess.TimeoutExpired("bash", self.timeout, output=stdout, stderr=stderr)
+                events = selector.select(min(remaining, self.POLL_INTERVAL))
+                if not events and self.process.poll() is not None:
+                    # The shell is gone but something it started still holds the pipes open
+                    closed = True
+                    break
+                for key, _ in events:
+                    chunk = os.read(key.fd, 65536)
+                    buffer = buffers[key.fileobj]
+                    if not chunk:
+                        closed = True
+                        selector.unregister(key.fileobj)
+                        continue
+                    # Only the tail can hold a marker that was not already complete before this chunk
+                    start = max(0, len(buffer) - len(line))
+                    buffer += chunk
+                    index = buffer.find(line, start)
+                    if index != -1:
+                        # Anything after the marker comes from background jobs and is dropped
+                        del buffer[index:]
+                        selector.unregister(key.fileobj)
+                        finished = True
+                    elif len(buffer) > limits[key.fileobj] + self.TAIL_BYTES:
+                        # Drop the middle of runaway output so memory stays bounded whatever the command prints
+                        limit = limits[key.fileobj]
+                        end = len(buffer) - self.TAIL_BYTES
+                        del buffer[limit:end]
+                        truncated.add(key.fileobj)
+
+        stdout, stderr = self._decode_output(buffers, truncated)
+        return stdout, stderr, closed, finished
+
+    def _decode_output(self, buffers: Dict[Any, bytearray], truncated: set) -> Tuple[str, str]:
+        """Decode the captured streams, capping each at its limit and keeping the stdout sentinels."""
+        stdout_buffer = buffers[self.process.stdout]
+        # The sentinels stay whole after the cut, so the PWD and exit code survive truncated output
+        body_end = stdout_buffer.rfind(_PWD_SENTINEL)
+        if body_end == -1:
+            body_end = len(stdout_buffer)
+
+        stdout = stdout_buffer[:body_end]
+        sentinels = stdout_buffer[body_end:]
+        if self.process.stdout in truncated or len(stdout) > self.MAX_STDOUT_BYTES:
+            stdout = stdout[: self.MAX_STDOUT_BYTES] + b"\n... (output truncated)"
+
+        stderr = buffers[self.process.stderr]
+        if self.process.stderr in truncated or len(stderr) > self.MAX_STDERR_BYTES:
+            stderr = stderr[: self.MAX_STDERR_BYTES] + b"\n... (error output truncated)"
+
+        return (stdout + sentinels).decode(errors="replace"), stderr.decode(errors="replace")
+
+    def _start_process(self):
+        """Launch the long-lived shell in the session's working directory."""
+        self.process = subprocess.Popen(
+            ["bash"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.working_dir,
+            env=self.session_env,
+            start_new_session=True,  # Own process group for timeout handling; unlike preexec_fn it allows vfork
+        )
+
+    def _kill_process(self):
+        """Terminate the shell and anything it started, leaving the next call to start a new one."""
+        if self.process is None:
+            return
+        try:
+            # Kill the process group
+            os.killpg(self.process.pid, signal.SIGTERM)
+            try:
+                self.process.wait(timeout=0.5)  # Give it time to terminate
+            except subprocess.TimeoutExpired:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                self.process.wait()
+        except ProcessLookupError:
+            pass
+        for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+            stream.close()
+        self.process = None
+
+    def close(self):
+        """Stop the shell for good, interrupting a command that is still running."""
+        process = self.process
+        if process is not None:
+            # Signal before taking the lock, so a running command ends now instead of holding it until its timeout
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        with self._lock:
+            self._kill_process()
 
     def _restart_session(self):
         """Restart the bash session."""
-        self.session_env = os.environ.copy()
-        self.working_dir = os.getcwd()
-        self.session_active = True
+        with self._lock:
+            self._kill_process()
+            self.session_env = None
+            self.working_dir = os.getcwd()
+            self.session_active = True
+            self._start_process()
         self.logger.info("Bash session restarted")
 
+    def set_env(self, overrides: Dict[str, str]):
+        """Start a new shell with environment variables overridden on top of the process environment.
+
+        Args:
+            overrides: Variables to set in the session
+        """
+        with self._lock:
+            self._kill_process()
+            self.session_env = {**os.environ, **overrides}
+            self._start_process()
+        self.logger.info(f"Bash session environment updated: {', '.join(overrides)}")
+
     def _is_dangerous_command(self, command: str) -> bool:
         """Check if a command is potentially dangerous.
 
@@ -167,19 +334,7 @@ class Bash(Tool):
         Returns:
             True if the command is considered dangerous
         """
-        # Basic security checks - can be extended
-        dangerous_patterns = [
-            "rm -rf /",
-            "dd if=/dev/zero",
-            ":(){ :|:& };:",  # Fork bomb
-            "mkfs.",
-            "format ",
-        ]
-
-        command_lower = command.lower().strip()
-        for pattern in dangerous_patterns:
-            if pattern.lower() in command_lower:
-                self.logger.warning(f"Blocked dangerous command: {command[:50]}...")
-                return True
-
+        if _DANGEROUS_RE.search(command):
+            self.logger.warning(f"Blocked dangerous command: {command[:50]}...")
+            return True
         return False
@@ -5,6 +5,8 @@ Designed for use with Linear API and other GraphQL services.
 
 import json
 import requests
+from collections import defaultdict
+from datetime import datetime
 from typing import Dict, Any, Optional, Union
 
 
@@ -315,8 +317,6 @@ class LinearClient(GraphQLClient):
         Returns:
             Properly formatted DateTime string for GraphQL
         """
-        from datetime import datetime
-
         # Handle different date formats
         try:
             # Try parsing as ISO format first
@@ -345,9 +345,6 @@ class LinearClient(GraphQLClient):
         Returns:
             Dictionary with grouped and ordered issues
         """
-        from datetime import datetime
-        from collections import defaultdict
-
         if not raw_data or "issues" not in raw_data or "nodes" not in raw_data["issues"]:
             return {"grouped_issues": {}, "summary": {"total_issues": 0, "total_assignees": 0}}
 